@@ -3,7 +3,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from config import Config
+from config import Config, engine_options
+from app.database import configure_engine
+from app.json_provider import FastJSONProvider
+from app.compression import init_compression
+from app.instrumentation import init_instrumentation
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -11,11 +15,16 @@ jwt = JWTManager()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(config_class)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
     
     db.init_app(app)
+    configure_engine(app, db)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    init_instrumentation(app, db)
+    init_compression(app)
     CORS(app, resources={r"/api/*": {"origins": "*", "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"]}})
     
     from app.routes import main
@@ -26,4 +35,7 @@ def create_app(config_class=Config):
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(bags_bp, url_prefix='/api/bags')
     
+    from app.commands import register_commands
+    register_commands(app)
+    
     return app
\ No newline at end of file
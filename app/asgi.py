@@ -0,0 +1,131 @@
+"""ASGI serving mode: I/O-bound endpoints as async views, everything else on Flask.
+
+Google sign-in, the waitlist, the SSE stream and the exports are served
+by the async twins of their Flask views (defined next to them in the
+blueprints) without holding a thread while they wait on Google, Redis or
+the database. Every other path falls through to the unchanged Flask app,
+which runs in a thread pool behind the same server.
+"""
+from a2wsgi import WSGIMiddleware
+from app import create_app
+from app.async_db import init_async_db
+from app.auth_routes import export_users_async, google_auth_async
+from app.bags_routes import (
+    export_games_async, get_waitlist_async, join_waitlist_async, leave_waitlist_async, pop_waitlist_async,
+    stream_updates_async
+)
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Mount, Route
+import io
+import sys
+
+
+def _environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope whose body has already been read"""
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin-1')
+    path_info = scope['path'].encode('utf-8').decode('latin-1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope['headers']:
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-length':
+            continue
+        key = 'CONTENT_TYPE' if name == 'content-type' else 'HTTP_' + name.upper().replace('-', '_')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncView:
+    """ASGI app running an async view inside a Flask request context.
+
+    The request is rebuilt as a Flask request, so views use request,
+    jsonify and Flask-JWT-Extended exactly as the sync views do, and the
+    app's before/after request hooks (instrumentation, CORS, compression)
+    and error handlers apply. The context stays pushed while the response
+    streams, so async generators can use current_app.
+    """
+
+    def __init__(self, flask_app, view):
+        self.flask_app = flask_app
+        self.view = view
+
+    async def __call__(self, scope, receive, send):
+        body = await Request(scope, receive).body()
+        with self.flask_app.request_context(_environ(scope, body)):
+            response = await self._dispatch()
+            await _to_asgi(response)(scope, receive, send)
+
+    async def _dispatch(self):
+        app = self.flask_app
+        try:
+            response = app.preprocess_request()
+            if response is None:
+                response = await self.view()
+            return app.process_response(app.make_response(response))
+        except Exception as e:
+            return app.process_response(app.make_response(app.handle_user_exception(e)))
+
+
+def _to_asgi(response):
+    """Starlette response carrying a Flask response's status, headers and body"""
+    if hasattr(response.response, '__aiter__'):
+        asgi_response = StreamingResponse(response.response, status_code=response.status_code)
+    else:
+        asgi_response = Response(response.get_data(), status_code=response.status_code)
+    asgi_response.raw_headers = [
+        (name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers.items()
+    ]
+    return asgi_response
+
+
+def create_asgi_app(config_class):
+    """Starlette app serving the async views and mounting the Flask app for the rest"""
+    flask_app = create_app(config_class)
+    init_async_db(flask_app)
+
+    def route(path, view, method):
+        return Route(path, AsyncView(flask_app, view), methods=[method])
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await flask_app.extensions['async_engine'].dispose()
+
+    # Unlisted methods (CORS preflights included) fall through to Flask
+    return Starlette(
+        routes=[
+            route('/api/auth/google', google_auth_async, 'POST'),
+            route('/api/auth/admin/export/users', export_users_async, 'GET'),
+            route('/api/bags/waitlist', get_waitlist_async, 'GET'),
+            route('/api/bags/waitlist', join_waitlist_async, 'POST'),
+            route('/api/bags/waitlist', leave_waitlist_async, 'DELETE'),
+            route('/api/bags/waitlist/next', pop_waitlist_async, 'POST'),
+            route('/api/bags/stream', stream_updates_async, 'GET'),
+            route('/api/bags/export/games', export_games_async, 'GET'),
+            Mount('/', app=WSGIMiddleware(flask_app))
+        ],
+        lifespan=lifespan
+    )
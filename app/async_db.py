@@ -0,0 +1,43 @@
+from app import db
+from app.database import sqlite_pragma_listener
+from app.instrumentation import instrument_engine
+from app.services.redis_service import get_redis
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Async driver for each database the sync app supports
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg'
+}
+
+def async_database_url(url):
+    """Same database as the sync engine's URL, addressed through its asyncio driver"""
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver configured for {backend}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+def init_async_db(app):
+    """Create the async engine and session factory for the ASGI handlers.
+
+    Uses the same URL and pool settings as Flask-SQLAlchemy; the session
+    factory is stored as app.extensions['async_session'].
+    """
+    # Flask-SQLAlchemy resolves relative SQLite paths against the instance
+    # folder, so start from its engine URL rather than the config string
+    with app.app_context():
+        url = db.engine.url
+        # Resolve the shared Redis client now: its first use pings Redis
+        # synchronously, which session hooks would otherwise do on the event loop
+        get_redis()
+    engine = create_async_engine(async_database_url(url), **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    if url.get_backend_name() == 'sqlite':
+        event.listen(engine.sync_engine, 'connect', sqlite_pragma_listener(app))
+    instrument_engine(app, engine.sync_engine)
+
+    # Handlers serialize objects after commit, so keep their loaded state
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    app.extensions['async_engine'] = engine
+    app.extensions['async_session'] = session_factory
+    return session_factory
@@ -1,8 +1,17 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from app import db
+from app import db, http_cache
 from app.models import User
-from app.services.google_auth_service import verify_google_token
+from app.services import google_auth_service
+from app.services.google_auth_service import verify_google_token, verify_google_token_async
+from app.services import leaderboard_service
+from app.services import stats_service
+from app.services import identity_service
+from app.services.identity_service import admin_required, async_admin_required
+from app.pagination import keyset_page
+from app.fields import requested_fields
+from app.instrumentation import query_budget
+from app.export import astream_export, requested_format, stream_export, users_export
 from datetime import datetime, timedelta
 import os
 
@@ -81,6 +90,10 @@ def login():
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 403
         
+        # Upgrade the stored hash to the configured method and cost
+        if user.password_needs_rehash():
+            user.set_password(data['password'])
+        
         # Update last login
         user.last_login = datetime.utcnow()
         db.session.commit()
@@ -103,9 +116,7 @@ def login():
 @auth_bp.route('/google', methods=['POST'])
 def google_auth():
     try:
-        data = request.get_json()
-        token = data.get('token')
-        
+        token = request.get_json().get('token')
         if not token:
             return jsonify({'error': 'Token required'}), 400
         
@@ -115,54 +126,34 @@ def google_auth():
         if not google_user_info:
             return jsonify({'error': 'Invalid token'}), 401
         
-        # Find or create user
-        user = User.query.filter_by(google_id=google_user_info['sub']).first()
+        user = google_auth_service.sign_in(db.session, google_user_info, ADMIN_EMAIL)
+        db.session.commit()
         
-        if not user:
-            # Check if user exists with this email
-            user = User.query.filter_by(email=google_user_info['email']).first()
-            
-            if user:
-                # Link Google account to existing user
-                user.google_id = google_user_info['sub']
-                user.google_picture_url = google_user_info.get('picture')
-            else:
-                # Create new user
-                user = User(
-                    email=google_user_info['email'],
-                    google_id=google_user_info['sub'],
-                    first_name=google_user_info.get('given_name'),
-                    last_name=google_user_info.get('family_name'),
-                    google_picture_url=google_user_info.get('picture')
-                )
-                
-                # Set admin if email matches
-                if user.email == ADMIN_EMAIL:
-                    user.is_admin = True
-                
-                db.session.add(user)
-        
-        # Update last login and picture
-        user.last_login = datetime.utcnow()
-        if google_user_info.get('picture'):
-            user.google_picture_url = google_user_info.get('picture')
+        return jsonify(google_auth_service.login_payload(user)), 200
         
-        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+async def google_auth_async():
+    """google_auth for the ASGI app; only a certificate refetch awaits the network"""
+    try:
+        token = request.get_json().get('token')
+        if not token:
+            return jsonify({'error': 'Token required'}), 400
         
-        # Create access token
-        access_token = create_access_token(
-            identity=user.id,
-            expires_delta=timedelta(days=30),
-            additional_claims={'is_admin': user.is_admin}
-        )
+        google_user_info = await verify_google_token_async(token)
         
-        return jsonify({
-            'access_token': access_token,
-            'user': user.to_dict(include_stats=True)
-        }), 200
+        if not google_user_info:
+            return jsonify({'error': 'Invalid token'}), 401
+        
+        async with current_app.extensions['async_session']() as session:
+            user = await session.run_sync(google_auth_service.sign_in, google_user_info, ADMIN_EMAIL)
+            await session.commit()
+        
+        return jsonify(google_auth_service.login_payload(user)), 200
         
     except Exception as e:
-        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/me', methods=['GET'])
@@ -176,7 +167,7 @@ def get_current_user():
             return jsonify({'error': 'User not found'}), 404
         
         return jsonify({
-            'user': user.to_dict(include_stats=True)
+            'user': user.to_dict(include_stats=True, fields=requested_fields())
         }), 200
         
     except Exception as e:
@@ -222,6 +213,11 @@ def update_profile():
         user.updated_at = datetime.utcnow()
         db.session.commit()
         
+        # Keep cached copies of this user in sync
+        identity_service.invalidate(user.id)
+        if leaderboard_service.update_player(user):
+            http_cache.bump('leaderboard')
+        
         return jsonify({
             'message': 'Profile updated successfully',
             'user': user.to_dict(include_stats=True)
@@ -263,36 +259,58 @@ def change_password():
 
 # Admin routes
 @auth_bp.route('/admin/users', methods=['GET'])
-@jwt_required()
+@admin_required
+@query_budget(5)
 def get_all_users():
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or not current_user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
-        # Get all users with stats
-        users = User.query.all()
-        users_data = [user.to_dict(include_stats=True) for user in users]
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        fields = requested_fields()
+        
+        # Stats come from counter columns, so this is one query however many users
+        if limit is None and cursor is None:
+            users = User.query.order_by(User.created_at.desc(), User.id.desc()).all()
+            next_cursor = None
+            total = len(users)
+        else:
+            users, next_cursor = keyset_page(User.query, User.created_at, User.id, cursor, min(limit or 50, 200))
+            total = User.query.count()
         
         return jsonify({
-            'users': users_data,
-            'total': len(users_data)
+            'users': [user.to_dict(include_stats=True, fields=fields) for user in users],
+            'total': total,
+            'next_cursor': next_cursor
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@auth_bp.route('/admin/export/users', methods=['GET'])
+@admin_required
+def export_users():
+    """Stream the member list as NDJSON (default) or CSV (?format=csv)"""
+    fmt = requested_format()
+    if not fmt:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    return stream_export(*users_export(), fmt, 'users')
+
+@async_admin_required
+async def export_users_async():
+    """export_users for the ASGI app"""
+    fmt = requested_format()
+    if not fmt:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    return astream_export(*users_export(), fmt, 'users')
+
 @auth_bp.route('/admin/users/<user_id>', methods=['PUT'])
-@jwt_required()
+@admin_required
 def update_user_admin(user_id):
     try:
         current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        
-        if not current_user or not current_user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
         
         user = User.query.get(user_id)
         if not user:
@@ -307,6 +325,7 @@ def update_user_admin(user_id):
             user.is_admin = data['is_admin']
         
         db.session.commit()
+        identity_service.invalidate(user.id)
         
         return jsonify({
             'message': 'User updated successfully',
@@ -318,29 +337,10 @@ def update_user_admin(user_id):
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/admin/stats', methods=['GET'])
-@jwt_required()
+@admin_required
 def get_admin_stats():
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or not current_user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
-        
-        # Get various stats
-        from app.models import Event, BagsGame, BagsTournament
-        
-        stats = {
-            'total_users': User.query.count(),
-            'active_users': User.query.filter_by(is_active=True).count(),
-            'total_events': Event.query.count(),
-            'total_sightings': 0,  # Placeholder for future feature
-            'total_bags_games': BagsGame.query.count(),
-            'total_tournaments': BagsTournament.query.count(),
-            'users_logged_in_today': User.query.filter(
-                User.last_login >= datetime.utcnow().replace(hour=0, minute=0, second=0)
-            ).count()
-        }
+        stats = stats_service.get_admin_stats()
         
         return jsonify(stats), 200
         
@@ -348,14 +348,10 @@ def get_admin_stats():
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/admin/invite', methods=['POST'])
-@jwt_required()
+@admin_required
 def invite_user():
     try:
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        
-        if not current_user or not current_user.is_admin:
-            return jsonify({'error': 'Unauthorized'}), 403
+        current_user = User.query.get(get_jwt_identity())
         
         data = request.get_json()
         
@@ -1,54 +1,89 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
-from app.models import User, BagsGame, BagsTournament
+from app.models import User, BagsGame, BagsGameParticipant, BagsTournament, PlayerRating, RatingSnapshot
+from app.services import (
+    bracket_service, leaderboard_service, matchmaking_service, pubsub_service, rating_service, rollup_service,
+    waitlist_service
+)
+from app.pagination import keyset_page
+from app.fields import pick_fields, requested_fields
+from app.export import astream_export, games_export, requested_format, stream_export
+from app.services import identity_service
+from app.services.identity_service import admin_required, async_admin_required, async_jwt_required
+from app import http_cache
+from app.http_cache import conditional_get
+from app.instrumentation import query_budget
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 import uuid
 
 bags_bp = Blueprint('bags', __name__)
 
 @bags_bp.route('/games', methods=['GET'])
 @jwt_required()
+@query_budget(4)
 def get_games():
-    """Get all bags games with optional filters"""
+    """Get bags games with optional filters, newest first.
+    
+    Pass the returned next_cursor as ?cursor= to fetch the following page;
+    the total is only counted when include_total=true.
+    """
     try:
         # Get query parameters
-        limit = request.args.get('limit', 50, type=int)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
         player_id = request.args.get('player_id')
         game_type = request.args.get('type')  # 'casual' or 'tournament'
+        fields = requested_fields()
         
         # Build query
         query = BagsGame.query
+        sort_column, id_column = BagsGame.started_at, BagsGame.id
         
-        # Filter by player if specified
+        # Filter by player through the participant index
         if player_id:
-            # This would need a more complex query to check JSON fields
-            # For now, return all games
-            pass
+            query = query.join(
+                BagsGameParticipant, BagsGameParticipant.game_id == BagsGame.id
+            ).filter(
+                BagsGameParticipant.player_id == player_id.replace('user_', '')
+            )
+            sort_column, id_column = BagsGameParticipant.started_at, BagsGameParticipant.game_id
         
         if game_type:
-            query = query.filter_by(game_type=game_type)
+            query = query.filter(BagsGame.game_type == game_type)
         
-        # Order by most recent first
-        query = query.order_by(BagsGame.started_at.desc())
+        total = query.order_by(None).count() if include_total else None
         
-        # Apply pagination
-        games = query.offset(offset).limit(limit).all()
-        total = query.count()
+        if offset and not cursor:
+            # Legacy offset paging, kept for older clients
+            games = query.order_by(sort_column.desc(), id_column.desc()).offset(offset).limit(limit).all()
+            next_cursor = None
+        else:
+            games, next_cursor = keyset_page(
+                query, sort_column, id_column, cursor, limit,
+                key=lambda game: (game.started_at, game.id)
+            )
         
         return jsonify({
-            'games': [game.to_dict() for game in games],
+            'games': [game.to_dict(fields) for game in games],
             'total': total,
             'limit': limit,
-            'offset': offset
+            'offset': offset,
+            'next_cursor': next_cursor
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bags_bp.route('/games', methods=['POST'])
 @jwt_required()
+@query_budget(13)
 def create_game():
     """Record a completed bags game"""
     try:
@@ -60,9 +95,22 @@ def create_game():
         for field in required:
             if field not in data:
                 return jsonify({'error': f'{field} is required'}), 400
+        duplicate = _duplicate_player(data)
+        if duplicate:
+            return jsonify({'error': f'{duplicate} appears more than once in the game'}), 400
+        
+        # A replayed game with a client-generated id is recorded only once
+        if data.get('id'):
+            existing = BagsGame.query.get(data['id'])
+            if existing:
+                return jsonify({
+                    'message': 'Game already recorded',
+                    'game': existing.to_dict()
+                }), 200
         
         # Create game record
         game = BagsGame(
+            id=data.get('id') or str(uuid.uuid4()),
             team1_players=data['team1_players'],
             team2_players=data['team2_players'],
             team1_score=data['team1_score'],
@@ -79,32 +127,197 @@ def create_game():
         # Calculate duration
         game.calculate_duration()
         
-        # Update player statistics
-        winning_team_players = game.team1_players if game.winning_team == 1 else game.team2_players
-        losing_team_players = game.team2_players if game.winning_team == 1 else game.team1_players
+        db.session.add(game)
+        db.session.flush()
         
-        # Update winners
-        for player in winning_team_players:
-            if player.get('id') and player['id'].startswith('user_'):
-                user = User.query.get(player['id'].replace('user_', ''))
-                if user:
-                    user.bags_wins += 1
+        # Index registered players for history lookups
+        participants = game.build_participants()
+        db.session.add_all(participants)
         
-        # Update losers
-        for player in losing_team_players:
-            if player.get('id') and player['id'].startswith('user_'):
-                user = User.query.get(player['id'].replace('user_', ''))
-                if user:
-                    user.bags_losses += 1
+        # Update player statistics with atomic server-side increments
+        increments = _stat_increments(participants)
+        User.apply_bags_increments(increments)
+        rating_service.record_games([game])
+        rollup_service.record_games([game])
         
-        db.session.add(game)
         db.session.commit()
         
+        _refresh_leaderboard(increments.keys())
+        
+        game_data = game.to_dict()
+        pubsub_service.publish('games', 'game_created', {'game': game_data})
+        if game.tournament_id:
+            pubsub_service.publish(f'tournament:{game.tournament_id}', 'game_created', {'game': game_data})
+        
         return jsonify({
             'message': 'Game recorded successfully',
-            'game': game.to_dict()
+            'game': game_data
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _duplicate_player(data):
+    """First registered player listed more than once in a game payload, or None"""
+    seen = set()
+    for player in (data['team1_players'] or []) + (data['team2_players'] or []):
+        player_id = player.get('id') if isinstance(player, dict) else None
+        if player_id and player_id.startswith('user_'):
+            if player_id in seen:
+                return player_id
+            seen.add(player_id)
+    return None
+
+def _stat_increments(participants):
+    """Aggregate win/loss deltas per player for User.apply_bags_increments"""
+    increments = {}
+    for p in participants:
+        column = 'bags_wins' if p.won else 'bags_losses'
+        deltas = increments.setdefault(p.player_id, {})
+        deltas[column] = deltas.get(column, 0) + 1
+    return increments
+
+def _refresh_leaderboard(user_ids):
+    """Re-rank players after a commit, loading them in one IN query"""
+    user_ids = list(user_ids)
+    if user_ids:
+        changed = [leaderboard_service.update_player(user) for user in User.query.filter(User.id.in_(user_ids))]
+        # One version bump for the whole refresh, not one write per player
+        if any(changed):
+            http_cache.bump('leaderboard')
+
+MAX_BATCH_GAMES = 500
+
+def _validate_game(data):
+    """Return an error message for a game payload, or None if it is valid"""
+    if not isinstance(data, dict):
+        return 'game must be an object'
+    for field in ['team1_players', 'team2_players', 'team1_score', 'team2_score']:
+        if field not in data:
+            return f'{field} is required'
+    if not isinstance(data['team1_players'], list) or not isinstance(data['team2_players'], list):
+        return 'teams must be lists of players'
+    if not all(isinstance(player, dict) for player in data['team1_players'] + data['team2_players']):
+        return 'players must be objects'
+    duplicate = _duplicate_player(data)
+    if duplicate:
+        return f'{duplicate} appears more than once in the game'
+    if not isinstance(data['team1_score'], int) or not isinstance(data['team2_score'], int):
+        return 'scores must be integers'
+    if 'id' in data and (not isinstance(data['id'], str) or not 0 < len(data['id']) <= 36):
+        return 'id must be a string of at most 36 characters'
+    for field in ('started_at', 'ended_at'):
+        if data.get(field) is not None:
+            try:
+                datetime.fromisoformat(data[field])
+            except (TypeError, ValueError):
+                return f'{field} must be an ISO timestamp'
+    return None
+
+@bags_bp.route('/games/batch', methods=['POST'])
+@jwt_required()
+@query_budget(13)
+def create_games_batch():
+    """Record many completed games in one transaction.
+    
+    Meant for scorekeepers replaying games queued while offline. Each game
+    should carry a client-generated id; games whose id already exists are
+    skipped, so replaying a batch is safe.
+    """
+    client_ids = []
+    try:
+        data = request.get_json() or {}
+        payloads = data.get('games')
+        
+        if not isinstance(payloads, list) or not payloads:
+            return jsonify({'error': 'games must be a non-empty list'}), 400
+        if len(payloads) > MAX_BATCH_GAMES:
+            return jsonify({'error': f'At most {MAX_BATCH_GAMES} games per batch'}), 400
+        
+        # Validate everything before writing anything
+        errors = [
+            {'index': index, 'error': error}
+            for index, error in enumerate(_validate_game(game) for game in payloads)
+            if error
+        ]
+        if errors:
+            return jsonify({'error': 'Invalid games', 'details': errors}), 400
+        
+        # Skip games already recorded by an earlier replay, or repeated in this batch
+        client_ids = [game['id'] for game in payloads if game.get('id')]
+        existing = set()
+        if client_ids:
+            existing = {
+                row.id for row in db.session.query(BagsGame.id).filter(BagsGame.id.in_(client_ids))
+            }
+        
+        games = []
+        for payload in payloads:
+            if payload.get('id'):
+                if payload['id'] in existing:
+                    continue
+                existing.add(payload['id'])
+            game = BagsGame(
+                id=payload.get('id') or str(uuid.uuid4()),
+                team1_players=payload['team1_players'],
+                team2_players=payload['team2_players'],
+                team1_score=payload['team1_score'],
+                team2_score=payload['team2_score'],
+                winning_team=1 if payload['team1_score'] > payload['team2_score'] else 2,
+                game_type=payload.get('game_type', 'casual'),
+                tournament_id=payload.get('tournament_id'),
+                tournament_round=payload.get('tournament_round'),
+                location=payload.get('location', 'Beach Club'),
+                started_at=datetime.fromisoformat(payload['started_at']) if payload.get('started_at') else datetime.utcnow(),
+                ended_at=datetime.fromisoformat(payload['ended_at']) if payload.get('ended_at') else datetime.utcnow()
+            )
+            game.calculate_duration()
+            games.append(game)
+        
+        if not games:
+            return jsonify({'message': 'All games already recorded', 'created': [], 'skipped': len(payloads)}), 200
+        
+        # Resolve every referenced registered player in one IN query
+        participants = [p for game in games for p in game.build_participants()]
+        referenced = {p.player_id for p in participants}
+        known = set()
+        if referenced:
+            known = {row.id for row in db.session.query(User.id).filter(User.id.in_(referenced))}
+        
+        increments = _stat_increments(p for p in participants if p.player_id in known)
+        
+        columns = [column.key for column in BagsGame.__table__.columns]
+        db.session.execute(db.insert(BagsGame), [
+            {column: getattr(game, column) for column in columns} for game in games
+        ])
+        if participants:
+            participant_columns = [column.key for column in BagsGameParticipant.__table__.columns]
+            db.session.execute(db.insert(BagsGameParticipant), [
+                {column: getattr(p, column) for column in participant_columns} for p in participants
+            ])
+        User.apply_bags_increments(increments)
+        rating_service.record_games(games)
+        rollup_service.record_games(games)
+        # Bulk inserts bypass the ORM change tracking that versions collections
+        http_cache.mark_changed(db.session, 'games')
+        db.session.commit()
+        
+        _refresh_leaderboard(increments.keys())
+        pubsub_service.publish('games', 'games_created', {'game_ids': [game.id for game in games]})
+        
+        return jsonify({
+            'message': f'Recorded {len(games)} games',
+            'created': [game.id for game in games],
+            'skipped': len(payloads) - len(games)
         }), 201
         
+    except IntegrityError:
+        db.session.rollback()
+        # Only a concurrent replay inserting some of these ids first makes a retry succeed
+        if client_ids and db.session.query(BagsGame.id).filter(BagsGame.id.in_(client_ids)).first():
+            return jsonify({'error': 'Some games were recorded concurrently, retry the batch'}), 409
+        return jsonify({'error': 'Games conflict with existing data'}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -118,13 +331,34 @@ def get_game(game_id):
         if not game:
             return jsonify({'error': 'Game not found'}), 404
         
-        return jsonify(game.to_dict()), 200
+        return jsonify(game.to_dict(requested_fields())), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bags_bp.route('/export/games', methods=['GET'])
+@admin_required
+def export_games():
+    """Stream the full game history as NDJSON (default) or CSV (?format=csv)"""
+    fmt = requested_format()
+    if not fmt:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    return stream_export(*games_export(), fmt, 'bags_games')
+
+@async_admin_required
+async def export_games_async():
+    """export_games for the ASGI app"""
+    fmt = requested_format()
+    if not fmt:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    return astream_export(*games_export(), fmt, 'bags_games')
+
 @bags_bp.route('/tournaments', methods=['GET'])
 @jwt_required()
+@conditional_get('tournaments', private=True)
+@query_budget(4)
 def get_tournaments():
     """Get all tournaments"""
     try:
@@ -134,10 +368,17 @@ def get_tournaments():
         if status:
             query = query.filter_by(status=status)
         
+        # Leave the large JSON columns unloaded when the client did not ask for them
+        fields = requested_fields()
+        if fields is not None:
+            for name in ('players', 'bracket'):
+                if name not in fields:
+                    query = query.options(db.defer(getattr(BagsTournament, name)))
+        
         tournaments = query.order_by(BagsTournament.created_at.desc()).all()
         
         return jsonify({
-            'tournaments': [t.to_dict() for t in tournaments]
+            'tournaments': [t.to_dict(fields) for t in tournaments]
         }), 200
         
     except Exception as e:
@@ -191,6 +432,11 @@ def update_tournament(tournament_id):
             return jsonify({'error': 'Tournament not found'}), 404
         
         data = request.get_json()
+        champion = None
+        
+        # Reject writes based on a stale copy of the tournament
+        if 'version' in data and data['version'] != tournament.version:
+            return jsonify({'error': 'Tournament was modified, reload and retry', 'version': tournament.version}), 409
         
         # Update allowed fields based on status
         if tournament.status == 'setup':
@@ -206,7 +452,8 @@ def update_tournament(tournament_id):
             
             tournament.status = 'in_progress'
             tournament.started_at = datetime.utcnow()
-            tournament.bracket = data.get('bracket', [])
+            tournament.bracket = data.get('bracket') or bracket_service.generate_bracket(tournament.players)
+            tournament.current_round = 1
         
         # Update bracket (for ongoing games)
         if data.get('action') == 'update_bracket':
@@ -215,60 +462,139 @@ def update_tournament(tournament_id):
         
         # Complete tournament
         if data.get('action') == 'complete':
-            tournament.status = 'completed'
-            tournament.completed_at = datetime.utcnow()
-            tournament.champion_id = data.get('champion_id')
-            tournament.champion_name = data.get('champion_name')
-            
-            # Update tournament wins for champion
-            if tournament.champion_id and tournament.champion_id.startswith('user_'):
-                user = User.query.get(tournament.champion_id.replace('user_', ''))
-                if user:
-                    user.bags_tournament_wins += 1
+            champion = _complete_tournament(tournament, data.get('champion_id'), data.get('champion_name'))
         
         db.session.commit()
         
+        if champion:
+            _refresh_leaderboard([champion])
+        
+        # Spectators get the changed fields; the bracket only when it changed
+        delta = {
+            'id': tournament.id,
+            'status': tournament.status,
+            'current_round': tournament.current_round,
+            'champion_id': tournament.champion_id,
+            'champion_name': tournament.champion_name
+        }
+        if data.get('action') in ('start', 'update_bracket'):
+            delta['bracket'] = tournament.bracket
+        pubsub_service.publish(f'tournament:{tournament.id}', 'tournament_updated', delta)
+        pubsub_service.publish('tournaments', 'tournament_updated', {
+            key: value for key, value in delta.items() if key != 'bracket'
+        })
+        
         return jsonify({
             'message': 'Tournament updated successfully',
             'tournament': tournament.to_dict()
         }), 200
         
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Tournament was modified, reload and retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@bags_bp.route('/tournaments/<tournament_id>/matches/<match_id>', methods=['POST'])
+@jwt_required()
+def record_match(tournament_id, match_id):
+    """Record one bracket match result and advance the winner server-side"""
+    try:
+        tournament = BagsTournament.query.get(tournament_id)
+        if not tournament:
+            return jsonify({'error': 'Tournament not found'}), 404
+        
+        if tournament.status != 'in_progress':
+            return jsonify({'error': 'Tournament is not in progress'}), 400
+        
+        data = request.get_json()
+        if 'score1' not in data or 'score2' not in data:
+            return jsonify({'error': 'score1 and score2 are required'}), 400
+        
+        if 'version' in data and data['version'] != tournament.version:
+            return jsonify({'error': 'Tournament was modified, reload and retry', 'version': tournament.version}), 409
+        
+        try:
+            score1, score2 = int(data['score1']), int(data['score2'])
+        except (TypeError, ValueError):
+            return jsonify({'error': 'score1 and score2 must be integers'}), 400
+        
+        try:
+            bracket, changed, winner = bracket_service.record_result(tournament.bracket or [], match_id, score1, score2)
+        except bracket_service.UnsupportedBracket as e:
+            # Client-managed brackets are updated whole through PUT update_bracket
+            return jsonify({'error': f'{e}; update this bracket with action=update_bracket'}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        tournament.bracket = bracket
+        tournament.current_round = bracket_service.current_round(bracket)
+        
+        champion = None
+        if winner:
+            champion = _complete_tournament(tournament, winner.get('id'), winner.get('name'))
+        
+        # The version check in the UPDATE rejects a concurrent scorekeeper
+        db.session.commit()
+        
+        if champion:
+            _refresh_leaderboard([champion])
+        
+        delta = {
+            'id': tournament.id,
+            'version': tournament.version,
+            'status': tournament.status,
+            'current_round': tournament.current_round,
+            'champion_id': tournament.champion_id,
+            'champion_name': tournament.champion_name,
+            'matches': changed
+        }
+        pubsub_service.publish(f'tournament:{tournament.id}', 'matches_updated', delta)
+        if winner:
+            pubsub_service.publish('tournaments', 'tournament_updated', {
+                key: value for key, value in delta.items() if key != 'matches'
+            })
+        
+        return jsonify(delta), 200
+        
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({'error': 'Tournament was modified, reload and retry'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _complete_tournament(tournament, champion_id, champion_name):
+    """Mark a tournament complete and credit the champion; returns the champion's user id if registered"""
+    tournament.status = 'completed'
+    tournament.completed_at = datetime.utcnow()
+    tournament.champion_id = champion_id
+    tournament.champion_name = champion_name
+    
+    # Update tournament wins for champion
+    if champion_id and champion_id.startswith('user_'):
+        champion = champion_id.replace('user_', '')
+        User.apply_bags_increments({champion: {'bags_tournament_wins': 1}})
+        return champion
+    return None
+
 @bags_bp.route('/stats/leaderboard', methods=['GET'])
 @jwt_required()
+@conditional_get('leaderboard', private=True)
+@query_budget(4)
 def get_leaderboard():
     """Get bags leaderboard"""
     try:
-        # Get all users with bags stats
-        users = User.query.filter(
-            db.or_(User.bags_wins > 0, User.bags_losses > 0)
-        ).all()
-        
-        # Calculate stats and sort
-        leaderboard = []
-        for user in users:
-            total_games = user.bags_wins + user.bags_losses
-            win_rate = user.get_bags_win_rate()
-            
-            leaderboard.append({
-                'id': user.id,
-                'name': user.get_display_name(),
-                'wins': user.bags_wins,
-                'losses': user.bags_losses,
-                'games_played': total_games,
-                'win_rate': win_rate,
-                'tournament_wins': user.bags_tournament_wins,
-                'avatar_url': user.avatar_url or user.google_picture_url
-            })
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
         
-        # Sort by wins, then win rate
-        leaderboard.sort(key=lambda x: (x['wins'], x['win_rate']), reverse=True)
+        fields = requested_fields()
+        me = leaderboard_service.get_rank(get_jwt_identity())
         
+        # Served from the precomputed ranking, never from the users table
         return jsonify({
-            'leaderboard': leaderboard[:50]  # Top 50 players
+            'leaderboard': [pick_fields(entry, fields) for entry in leaderboard_service.get_top(limit)],
+            'me': pick_fields(me, fields | {'rank'} if fields else None) if me else None
         }), 200
         
     except Exception as e:
@@ -276,6 +602,7 @@ def get_leaderboard():
 
 @bags_bp.route('/stats/player/<player_id>', methods=['GET'])
 @jwt_required()
+@query_budget(8)
 def get_player_stats(player_id):
     """Get detailed stats for a specific player"""
     try:
@@ -283,9 +610,10 @@ def get_player_stats(player_id):
         if not user:
             return jsonify({'error': 'Player not found'}), 404
         
-        # Get recent games
-        # This would need a more complex query to search JSON fields
-        # For now, return basic stats
+        # Get recent games from the participant index
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        recent = BagsGameParticipant.history_query(user.id).offset(offset).limit(limit).all()
         
         stats = {
             'player': {
@@ -298,9 +626,14 @@ def get_player_stats(player_id):
                 'losses': user.bags_losses,
                 'games_played': user.bags_wins + user.bags_losses,
                 'win_rate': user.get_bags_win_rate(),
-                'tournament_wins': user.bags_tournament_wins
+                'tournament_wins': user.bags_tournament_wins,
+                'rating': round(rating_service.get_ratings([user.id])[user.id], 1)
             },
-            'recent_games': [],  # Would populate with actual games
+            'periods': rollup_service.get_period_summary(user.id),
+            'head_to_head': _named_matchups(rollup_service.get_matchups(user.id), HEAD_TO_HEAD_LIMIT),
+            'recent_games': [
+                dict(p.game.to_dict(), team=p.team, won=p.won) for p in recent
+            ],
             'achievements': []  # Could add achievement system
         }
         
@@ -309,23 +642,282 @@ def get_player_stats(player_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@bags_bp.route('/waitlist', methods=['GET'])
+HEAD_TO_HEAD_LIMIT = 5
+
+def _named_matchups(matchups, limit):
+    """Trim partner/opponent lists and add names with one IN query"""
+    matchups = {relation: records[:limit] for relation, records in matchups.items()}
+    ids = {record['player_id'] for records in matchups.values() for record in records}
+    names = {}
+    if ids:
+        names = {user.id: user.get_display_name() for user in User.query.filter(User.id.in_(ids))}
+    for records in matchups.values():
+        for record in records:
+            record['name'] = names.get(record['player_id'])
+    return matchups
+
+@bags_bp.route('/stats/player/<player_id>/matchups', methods=['GET'])
 @jwt_required()
-def get_waitlist():
-    """Get current waitlist (stored in memory/cache in production)"""
-    # In production, this would use Redis or similar
-    # For now, return empty list
+@conditional_get('games')
+@query_budget(3)
+def get_player_matchups(player_id):
+    """Partner and opponent records for a player (?season=YYYY, default all seasons)"""
+    try:
+        season = request.args.get('season', type=int)
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        
+        return jsonify(dict(
+            _named_matchups(rollup_service.get_matchups(player_id, season), limit),
+            player_id=player_id,
+            season=season
+        )), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bags_bp.route('/stats/ratings', methods=['GET'])
+@jwt_required()
+@conditional_get('games')
+def get_ratings():
+    """Players ordered by skill rating"""
+    try:
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+        
+        rows = db.session.query(PlayerRating, User).join(User, User.id == PlayerRating.player_id).order_by(
+            PlayerRating.rating.desc(), PlayerRating.player_id
+        ).limit(limit).all()
+        
+        return jsonify({
+            'ratings': [
+                dict(rating.to_dict(), name=user.get_display_name()) for rating, user in rows
+            ]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bags_bp.route('/stats/player/<player_id>/ratings', methods=['GET'])
+@jwt_required()
+@conditional_get('games')
+def get_rating_history(player_id):
+    """Rating after each of a player's games, newest first"""
+    try:
+        try:
+            limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        # Read straight from the stored snapshots; nothing is recomputed
+        query = RatingSnapshot.query.filter_by(player_id=player_id)
+        try:
+            snapshots, next_cursor = keyset_page(
+                query, RatingSnapshot.rated_at, RatingSnapshot.game_id, request.args.get('cursor'), limit
+            )
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        return jsonify({
+            'player_id': player_id,
+            'history': [snapshot.to_dict() for snapshot in snapshots],
+            'next_cursor': next_cursor
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _waitlist_limit():
+    return min(max(request.args.get('limit', 100, type=int), 1), 500)
+
+def _joined(added, position):
     return jsonify({
-        'waitlist': []
+        'message': 'Added to waitlist' if added else 'Already on waitlist',
+        'position': position
     }), 200
 
+def _leaving_player(user_id):
+    data = request.get_json(silent=True) or {}
+    return data.get('player_id') or request.args.get('player_id') or 'user_' + user_id
+
+def _cannot_remove():
+    return jsonify({'error': 'Cannot remove another member from the waitlist'}), 403
+
+def _pop_count():
+    data = request.get_json(silent=True) or {}
+    return min(max(int(data.get('count', 1)), 1), 8)
+
+@bags_bp.route('/waitlist', methods=['GET'])
+@jwt_required()
+def get_waitlist():
+    """Get current waitlist in queue order"""
+    try:
+        return jsonify(waitlist_service.snapshot(_waitlist_limit(), 'user_' + get_jwt_identity())), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_jwt_required()
+async def get_waitlist_async():
+    """get_waitlist for the ASGI app"""
+    try:
+        return jsonify(await waitlist_service.asnapshot(_waitlist_limit(), 'user_' + get_jwt_identity())), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bags_bp.route('/waitlist', methods=['POST'])
 @jwt_required()
 def join_waitlist():
-    """Join the waitlist"""
-    # In production, this would use Redis or similar
-    # For now, just return success
-    return jsonify({
-        'message': 'Added to waitlist',
-        'position': 1
-    }), 200
\ No newline at end of file
+    """Join the waitlist (yourself by default, or a guest via player_id)"""
+    try:
+        data = request.get_json() or {}
+        player_id = data.get('player_id') or 'user_' + get_jwt_identity()
+        name = data.get('name') or waitlist_service.member_name(db.session, player_id)
+        if not name:
+            return jsonify({'error': 'name is required'}), 400
+        
+        return _joined(*waitlist_service.join(player_id, name))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_jwt_required()
+async def join_waitlist_async():
+    """join_waitlist for the ASGI app"""
+    try:
+        data = request.get_json() or {}
+        player_id = data.get('player_id') or 'user_' + get_jwt_identity()
+        name = data.get('name') or await waitlist_service.amember_name(player_id)
+        if not name:
+            return jsonify({'error': 'name is required'}), 400
+        
+        return _joined(*await waitlist_service.ajoin(player_id, name))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bags_bp.route('/waitlist', methods=['DELETE'])
+@jwt_required()
+def leave_waitlist():
+    """Leave the waitlist (yourself by default, or a guest via player_id)"""
+    try:
+        user_id = get_jwt_identity()
+        player_id = _leaving_player(user_id)
+        if not waitlist_service.may_remove(player_id, user_id) and \
+                not identity_service.is_active_admin(identity_service.get_identity(user_id)):
+            return _cannot_remove()
+        
+        if not waitlist_service.leave(player_id):
+            return jsonify({'error': 'Not on waitlist'}), 404
+        return jsonify({'message': 'Removed from waitlist'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_jwt_required()
+async def leave_waitlist_async():
+    """leave_waitlist for the ASGI app"""
+    try:
+        user_id = get_jwt_identity()
+        player_id = _leaving_player(user_id)
+        if not waitlist_service.may_remove(player_id, user_id) and \
+                not identity_service.is_active_admin(await identity_service.get_identity_async(user_id)):
+            return _cannot_remove()
+        
+        if not await waitlist_service.aleave(player_id):
+            return jsonify({'error': 'Not on waitlist'}), 404
+        return jsonify({'message': 'Removed from waitlist'}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bags_bp.route('/waitlist/next', methods=['POST'])
+@admin_required
+def pop_waitlist():
+    """Take the next players off the waitlist for a game.
+    
+    Admins only: the head of the queue is usually other members, and only
+    admins may remove other members (see leave_waitlist).
+    """
+    try:
+        return jsonify({'players': waitlist_service.pop_next(_pop_count())}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@async_admin_required
+async def pop_waitlist_async():
+    """pop_waitlist for the ASGI app"""
+    try:
+        return jsonify({'players': await waitlist_service.apop_next(_pop_count())}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bags_bp.route('/waitlist/match', methods=['GET'])
+@jwt_required()
+def preview_match():
+    """Propose balanced 2v2 teams from the head of the waitlist without removing anyone"""
+    try:
+        match = matchmaking_service.propose_match(request.args.get('window', type=int))
+        if not match:
+            return jsonify({'error': 'At least 4 players must be waiting'}), 404
+        
+        return jsonify({'match': match}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bags_bp.route('/waitlist/match', methods=['POST'])
+@admin_required
+def create_match():
+    """Take the proposed balanced teams off the waitlist (admins only, like pop_waitlist)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        match = matchmaking_service.propose_match(data.get('window'))
+        if not match:
+            return jsonify({'error': 'At least 4 players must be waiting'}), 404
+        
+        player_ids = [p['id'] for p in match['team1_players'] + match['team2_players']]
+        if not waitlist_service.take(player_ids):
+            # Someone left or was matched concurrently; the next proposal will differ
+            return jsonify({'error': 'Waitlist changed, try again'}), 409
+        
+        return jsonify({'match': match}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+STREAM_CHANNELS = ('games', 'tournaments', 'waitlist')
+
+def _stream_channels():
+    """(requested channels, first unknown channel or None)"""
+    channels = [c for c in request.args.get('channels', 'waitlist').split(',') if c]
+    unknown = [c for c in channels if c not in STREAM_CHANNELS and not c.startswith('tournament:')]
+    return channels, unknown[0] if unknown else None
+
+def _event_stream(body):
+    return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bags_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_updates():
+    """Server-Sent Events for live games, tournaments and the waitlist.
+    
+    Subscribe with ?channels=waitlist,tournament:<id> (games, tournaments,
+    waitlist or tournament:<id>). EventSource cannot set headers, so the
+    token may be passed as ?jwt=.
+    """
+    channels, unknown = _stream_channels()
+    if unknown:
+        return jsonify({'error': f'Unknown channel {unknown}'}), 400
+    
+    return _event_stream(stream_with_context(pubsub_service.stream(channels)))
+
+@async_jwt_required(locations=['headers', 'query_string'])
+async def stream_updates_async():
+    """stream_updates for the ASGI app: an idle subscriber costs a coroutine, not a thread"""
+    channels, unknown = _stream_channels()
+    if unknown:
+        return jsonify({'error': f'Unknown channel {unknown}'}), 400
+    
+    return _event_stream(pubsub_service.astream(channels))
@@ -0,0 +1,126 @@
+import click
+from app import db
+from sqlalchemy.schema import CreateColumn
+from app.models import User, BagsGame, BagsGameParticipant, BagsTournament
+from app import http_cache
+from app.services import leaderboard_service, rating_service, rollup_service
+
+
+def register_commands(app):
+    @app.cli.command('upgrade-schema')
+    def upgrade_schema():
+        """Create missing tables and add columns declared on the models to existing tables.
+        
+        Safe to re-run. A new NOT NULL column needs a server default, which
+        fills it in for existing rows (e.g. bags_tournaments.version = 1).
+        """
+        db.create_all()
+        inspector = db.inspect(db.engine)
+        preparer = db.engine.dialect.identifier_preparer
+        added = []
+        with db.engine.begin() as connection:
+            for table in db.metadata.sorted_tables:
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    if not column.nullable and column.server_default is None:
+                        raise click.ClickException(f'{table.name}.{column.name} is NOT NULL without a server default')
+                    definition = CreateColumn(column).compile(dialect=db.engine.dialect)
+                    connection.execute(db.text(f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}'))
+                    added.append(f'{table.name}.{column.name}')
+        click.echo(f"Added columns: {', '.join(added)}" if added else 'Schema up to date')
+    
+    @app.cli.command('create-indexes')
+    def create_indexes():
+        """Add indexes declared on the models to an existing database"""
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        click.echo('Indexes up to date')
+    
+    @app.cli.command('backfill-participants')
+    @click.option('--batch-size', default=500, help='Games processed per commit')
+    def backfill_participants(batch_size):
+        """Create the participant index and fill it from existing games"""
+        BagsGameParticipant.__table__.create(db.engine, checkfirst=True)
+        
+        last_id = ''
+        total = 0
+        while True:
+            games = BagsGame.query.filter(BagsGame.id > last_id).order_by(BagsGame.id).limit(batch_size).all()
+            if not games:
+                break
+            last_id = games[-1].id
+            
+            # Skip games that are already indexed so the command can be re-run
+            indexed = {
+                row.game_id for row in db.session.query(BagsGameParticipant.game_id).filter(
+                    BagsGameParticipant.game_id.in_([game.id for game in games])
+                )
+            }
+            for game in games:
+                if game.id not in indexed:
+                    db.session.add_all(game.build_participants())
+                    total += 1
+            db.session.commit()
+        
+        click.echo(f'Indexed {total} games')
+    
+    @app.cli.command('recount-events')
+    def recount_events():
+        """Recompute User.events_created from the events table"""
+        counts = User.count_events_by_user()
+        User.query.update({User.events_created: 0}, synchronize_session=False)
+        for user_id, count in counts.items():
+            User.query.filter_by(id=user_id).update({User.events_created: count}, synchronize_session=False)
+        db.session.commit()
+        click.echo(f'Updated event counts for {len(counts)} users')
+    
+    @app.cli.command('reconcile-bags-stats')
+    def reconcile_bags_stats():
+        """Recompute bags win/loss/tournament counters from game history"""
+        results = db.session.query(
+            BagsGameParticipant.player_id,
+            db.func.sum(db.case((BagsGameParticipant.won, 1), else_=0)),
+            db.func.sum(db.case((BagsGameParticipant.won, 0), else_=1))
+        ).group_by(BagsGameParticipant.player_id).all()
+        
+        champions = db.session.query(
+            BagsTournament.champion_id, db.func.count(BagsTournament.id)
+        ).filter(
+            BagsTournament.status == 'completed', BagsTournament.champion_id.like('user_%')
+        ).group_by(BagsTournament.champion_id).all()
+        
+        totals = {}
+        for player_id, wins, losses in results:
+            totals[player_id] = {'bags_wins': wins, 'bags_losses': losses, 'bags_tournament_wins': 0}
+        for champion_id, count in champions:
+            player_id = champion_id.replace('user_', '')
+            totals.setdefault(player_id, {'bags_wins': 0, 'bags_losses': 0})['bags_tournament_wins'] = count
+        
+        User.query.update(
+            {User.bags_wins: 0, User.bags_losses: 0, User.bags_tournament_wins: 0},
+            synchronize_session=False
+        )
+        for player_id, values in totals.items():
+            User.query.filter_by(id=player_id).update(values, synchronize_session=False)
+        db.session.commit()
+        
+        leaderboard_service.rebuild()
+        click.echo(f'Reconciled bags stats for {len(totals)} players')
+    
+    @app.cli.command('recalculate-ratings')
+    def recalculate_ratings():
+        """Replay every game to rebuild player ratings and rating history"""
+        games, players = rating_service.replay_all()
+        # Bulk writes bypass the ORM change tracking that versions collections
+        http_cache.bump('games')
+        click.echo(f'Rated {players} players from {games} games')
+    
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups():
+        """Recompute per-period player stats and head-to-head records from every game"""
+        games, periods, matchups = rollup_service.rebuild()
+        http_cache.bump('games')
+        click.echo(f'Rolled up {games} games into {periods} period rows and {matchups} matchup rows')
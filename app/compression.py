@@ -0,0 +1,35 @@
+from flask import request
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+def init_compression(app):
+    """Compress large responses with brotli or gzip, as the client accepts"""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+
+    @app.after_request
+    def compress_response(response):
+        # Streams (SSE, exports) are left alone so they keep flushing promptly
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not response.mimetype.startswith(COMPRESSIBLE_TYPES)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        if len(data) < app.config['COMPRESS_MIN_SIZE']:
+            return response
+
+        if brotli is not None and 'br' in request.accept_encodings:
+            response.set_data(brotli.compress(data, quality=4))
+            response.headers['Content-Encoding'] = 'br'
+        elif 'gzip' in request.accept_encodings:
+            response.set_data(gzip.compress(data, compresslevel=app.config['COMPRESS_LEVEL']))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
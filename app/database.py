@@ -0,0 +1,25 @@
+from sqlalchemy import event
+
+def sqlite_pragma_listener(app):
+    """Connect listener applying the configured SQLite pragmas to each new connection"""
+    pragmas = [
+        f"PRAGMA journal_mode={app.config.get('SQLITE_JOURNAL_MODE', 'WAL')}",
+        f"PRAGMA synchronous={app.config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA mmap_size={int(app.config.get('SQLITE_MMAP_SIZE', 0))}"
+    ]
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return set_pragmas
+
+def configure_engine(app, db):
+    """Apply per-connection settings the URL and engine options cannot express"""
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', sqlite_pragma_listener(app))
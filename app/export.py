@@ -0,0 +1,105 @@
+from app import db
+from flask import Response, current_app, request, stream_with_context
+import csv
+import io
+
+EXPORT_BATCH_SIZE = 1000
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return current_app.json.dumps(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+class _Formatter:
+    """Turns batches of rows into NDJSON or CSV text chunks"""
+
+    def __init__(self, columns, fmt):
+        self.fmt = fmt
+        self.dumps = current_app.json.dumps
+        if fmt == 'csv':
+            self.buffer = io.StringIO()
+            self.writer = csv.writer(self.buffer)
+            self.writer.writerow(columns)
+
+    def header(self):
+        """CSV header row, or None for NDJSON"""
+        return self.buffer.getvalue() if self.fmt == 'csv' else None
+
+    def chunk(self, batch):
+        if self.fmt != 'csv':
+            return ''.join(self.dumps(row._asdict()) + '\n' for row in batch)
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.writer.writerows([_csv_value(value) for value in row] for row in batch)
+        return self.buffer.getvalue()
+
+def _generate(statement, columns, fmt):
+    # Server-side cursor: rows arrive in batches, never all at once
+    result = db.session.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+    try:
+        formatter = _Formatter(columns, fmt)
+        if formatter.header():
+            yield formatter.header()
+        for batch in result.partitions():
+            yield formatter.chunk(batch)
+    finally:
+        result.close()
+
+async def _agenerate(statement, columns, fmt):
+    """_generate for async views, streaming from an async session"""
+    async with current_app.extensions['async_session']() as session:
+        result = await session.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        try:
+            formatter = _Formatter(columns, fmt)
+            if formatter.header():
+                yield formatter.header()
+            async for batch in result.partitions():
+                yield formatter.chunk(batch)
+        finally:
+            await result.close()
+
+def requested_format():
+    """Export format from ?format= (ndjson by default), or None if unsupported"""
+    fmt = request.args.get('format', 'ndjson')
+    return fmt if fmt in FORMATS else None
+
+# Everything but credentials
+EXPORT_USER_COLUMNS = [
+    'id', 'email', 'first_name', 'last_name', 'display_name', 'is_admin', 'is_active',
+    'beach_member_since', 'bags_wins', 'bags_losses', 'bags_tournament_wins',
+    'events_created', 'sasquatch_sightings', 'created_at', 'last_login'
+]
+
+def users_export():
+    """(statement, columns) for the member list"""
+    from app.models import User
+    columns = [getattr(User, name) for name in EXPORT_USER_COLUMNS]
+    return db.select(*columns).order_by(User.created_at, User.id), EXPORT_USER_COLUMNS
+
+def games_export():
+    """(statement, columns) for the full game history"""
+    from app.models import BagsGame
+    columns = list(BagsGame.__table__.columns)
+    statement = db.select(*columns).order_by(BagsGame.started_at, BagsGame.id)
+    return statement, [column.key for column in columns]
+
+def _export_response(body, fmt, filename):
+    return Response(
+        body,
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
+
+def stream_export(statement, columns, fmt, filename):
+    """Streaming NDJSON or CSV download of a select statement, flat in memory"""
+    return _export_response(stream_with_context(_generate(statement, columns, fmt)), fmt, filename)
+
+def astream_export(statement, columns, fmt, filename):
+    """stream_export for async views; the body is an async generator served by app.asgi"""
+    return _export_response(_agenerate(statement, columns, fmt), fmt, filename)
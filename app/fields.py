@@ -0,0 +1,19 @@
+from flask import request
+
+def requested_fields():
+    """Sparse fieldset from ?fields=id,name,score, or None for every field"""
+    raw = request.args.get('fields')
+    if not raw:
+        return None
+    return {name.strip() for name in raw.split(',') if name.strip()}
+
+def pick_fields(data, fields):
+    """Keep only the requested keys of an already built dict, so the rest is never encoded or sent"""
+    if fields is None:
+        return data
+    return {key: value for key, value in data.items() if key in fields}
+
+
+def build_fields(getters, fields):
+    """Call only the getters for requested keys, so unrequested attributes are never loaded"""
+    return {key: get() for key, get in getters.items() if fields is None or key in fields}
@@ -0,0 +1,158 @@
+from app import db
+from app.services.redis_service import get_redis
+from flask import make_response, request
+from flask_jwt_extended import get_jwt_identity
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from werkzeug.http import http_date
+import hashlib
+import time
+
+VERSION_KEY = 'collection_version:{}'
+MODIFIED_KEY = 'collection_modified:{}'
+
+def _increment(connection, collections, now):
+    """Bump collection_versions rows on connection, inside its transaction"""
+    from app.models import CollectionVersion
+    table = CollectionVersion.__table__
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialect == 'sqlite' else postgresql).insert(table)
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=['name'],
+            set_={'version': table.c.version + 1, 'modified_at': insert.excluded.modified_at}
+        ), [{'name': name, 'version': 1, 'modified_at': now} for name in collections])
+        return
+
+    # Other databases: increment existing rows, then insert the rest
+    for name in collections:
+        updated = connection.execute(
+            db.update(table).where(table.c.name == name).values(version=table.c.version + 1, modified_at=now)
+        )
+        if not updated.rowcount:
+            connection.execute(db.insert(table).values(name=name, version=1, modified_at=now))
+
+def bump(*collections):
+    """Mark collections as changed; call after the change is committed.
+
+    Without Redis the counters live in the database, so every worker
+    process sees the same versions. Writes made through the session are
+    versioned with their commit instead (see mark_changed).
+    """
+    now = int(time.time())
+    client = get_redis()
+    if client:
+        pipe = client.pipeline()
+        for name in collections:
+            pipe.incr(VERSION_KEY.format(name))
+            pipe.set(MODIFIED_KEY.format(name), now)
+        pipe.execute()
+        return
+    with db.engine.begin() as connection:
+        _increment(connection, collections, now)
+
+def get_version(name):
+    """(version tag, last-modified unix time) for a collection"""
+    client = get_redis()
+    if client:
+        counter, modified = client.mget(VERSION_KEY.format(name), MODIFIED_KEY.format(name))
+        return f'r{counter or 0}', int(modified or 0)
+    from app.models import CollectionVersion
+    row = db.session.execute(
+        db.select(CollectionVersion.version, CollectionVersion.modified_at).where(CollectionVersion.name == name)
+    ).first()
+    return (f'd{row.version}', row.modified_at) if row else ('d0', 0)
+
+def conditional_get(*collections, private=False, vary=None):
+    """Serve 304 Not Modified when none of the collections changed since the client's copy.
+
+    The ETag covers the collection versions and the full URL (plus the
+    caller's identity for private responses), so the check costs one
+    version lookup and no rows. private=True requires a verified JWT.
+
+    For responses that also depend on the clock, vary() returns extra text
+    for the ETag (e.g. the current month), or None to skip conditional
+    handling for that request. Varied responses carry no Last-Modified,
+    since a write time alone cannot validate them.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            variant = vary() if vary else ''
+            if variant is None:
+                return f(*args, **kwargs)
+            
+            versions = [get_version(name) for name in collections]
+            parts = [tag for tag, _ in versions] + [request.full_path, variant]
+            if private:
+                parts.append(str(get_jwt_identity()))
+            etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+            modified = None if variant else max(modified for _, modified in versions) or None
+            cache_control = ('private' if private else 'public') + ', no-cache'
+
+            not_modified = request.if_none_match.contains_weak(etag) if request.if_none_match else (
+                modified is not None and request.if_modified_since is not None
+                and modified <= request.if_modified_since.timestamp()
+            )
+            if not_modified:
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            # Weak, so the tag stays valid when the body is compressed
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = cache_control
+            if modified:
+                response.headers['Last-Modified'] = http_date(modified)
+            return response
+        return decorated
+    return decorator
+
+
+# Models whose commits change a cacheable collection
+_COLLECTIONS = {
+    'Event': 'events',
+    'BagsTournament': 'tournaments',
+    'BagsGame': 'games'
+}
+
+def mark_changed(session, *collections):
+    """Version collections changed by bulk statements the ORM does not track.
+
+    Call before the session commits; the bump happens with the commit, like
+    it does for tracked model changes.
+    """
+    session.info.setdefault('changed_collections', set()).update(collections)
+
+@event.listens_for(Session, 'after_flush')
+def _track_changes(session, flush_context):
+    changed = session.info.setdefault('changed_collections', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        name = _COLLECTIONS.get(type(obj).__name__)
+        if name:
+            changed.add(name)
+
+@event.listens_for(Session, 'before_commit')
+def _version_changes(session):
+    # Flush first so changes still pending at commit are tracked too
+    session.flush()
+    if not session.info.get('changed_collections') or get_redis():
+        return
+    # No shared store: one upsert for every changed collection, as the last
+    # statement of the transaction so the version rows stay locked briefly
+    changed = session.info.pop('changed_collections')
+    _increment(session.connection(), sorted(changed), int(time.time()))
+
+@event.listens_for(Session, 'after_commit')
+def _bump_committed(session):
+    changed = session.info.pop('changed_collections', None)
+    if changed:
+        bump(*changed)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('changed_collections', None)
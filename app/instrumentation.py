@@ -0,0 +1,184 @@
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+import bisect
+import threading
+import time
+
+# Upper bounds of the latency and statement-count histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in strict mode when a request issues more SQL statements than its budget"""
+
+
+def query_budget(limit):
+    """Declare the most SQL statements a view may issue per request.
+
+    Place it directly above the view function, below the route and auth
+    decorators, so the budget is carried onto the registered wrapper.
+    """
+    def decorator(f):
+        f.query_budget = limit
+        return f
+    return decorator
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """Per-process counters rendered in the Prometheus text format.
+
+    Each worker keeps its own numbers; scrape every worker (or run one)
+    to get the whole picture.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # (method, endpoint, status) -> count
+        self.durations = {}  # endpoint -> Histogram of seconds
+        self.queries = {}  # endpoint -> Histogram of statements per request
+        self.statements = 0
+        self.statement_seconds = 0.0
+        self.slow_queries = 0
+
+    def observe_request(self, method, endpoint, status, seconds, statements):
+        with self.lock:
+            key = (method, endpoint, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.durations.setdefault(endpoint, Histogram(DURATION_BUCKETS)).observe(seconds)
+            self.queries.setdefault(endpoint, Histogram(QUERY_COUNT_BUCKETS)).observe(statements)
+
+    def observe_statement(self, seconds, slow):
+        with self.lock:
+            self.statements += 1
+            self.statement_seconds += seconds
+            self.slow_queries += slow
+
+    def render(self):
+        lines = []
+
+        def histogram(name, help_text, histograms):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for endpoint, hist in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(hist.buckets + ('+Inf',), hist.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {hist.sum}')
+                lines.append(f'{name}_count{{endpoint="{endpoint}"}} {cumulative}')
+
+        with self.lock:
+            lines.append('# HELP http_requests_total Requests handled, by endpoint and status')
+            lines.append('# TYPE http_requests_total counter')
+            for (method, endpoint, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",endpoint="{endpoint}",status="{status}"}} {count}')
+            histogram('http_request_duration_seconds', 'Time spent handling requests', self.durations)
+            histogram('http_request_db_statements', 'SQL statements issued per request', self.queries)
+            lines.append('# HELP db_statements_total SQL statements executed')
+            lines.append('# TYPE db_statements_total counter')
+            lines.append(f'db_statements_total {self.statements}')
+            lines.append('# HELP db_statement_seconds_total Time spent executing SQL statements')
+            lines.append('# TYPE db_statement_seconds_total counter')
+            lines.append(f'db_statement_seconds_total {self.statement_seconds}')
+            lines.append('# HELP db_slow_statements_total SQL statements slower than SLOW_QUERY_MS')
+            lines.append('# TYPE db_slow_statements_total counter')
+            lines.append(f'db_slow_statements_total {self.slow_queries}')
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_engine(app, engine):
+    """Time the statements of a (sync) engine; a no-op unless instrumentation is on.
+
+    Async engines are instrumented through their sync_engine.
+    """
+    metrics = app.extensions.get('metrics')
+    if metrics is None:
+        return
+    slow_query = app.config['SLOW_QUERY_MS'] / 1000
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        slow = elapsed >= slow_query
+        metrics.observe_statement(elapsed, slow)
+        if slow:
+            app.logger.warning('Slow query (%.0f ms): %s', elapsed * 1000, ' '.join(statement.split())[:500])
+        if has_request_context() and 'request_started' in g:
+            g.query_count += 1
+            g.query_seconds += elapsed
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def init_instrumentation(app, db):
+    """Time requests and SQL statements when INSTRUMENTATION_ENABLED is set.
+
+    Adds a Server-Timing header, logs slow requests and statements, serves
+    GET /metrics, and checks views against their declared query_budget:
+    over-budget requests are logged, or raise QueryBudgetExceeded when
+    QUERY_BUDGET_STRICT is set (meant for test runs).
+    """
+    app.config.setdefault('INSTRUMENTATION_ENABLED', False)
+    app.config.setdefault('SLOW_REQUEST_MS', 500)
+    app.config.setdefault('SLOW_QUERY_MS', 100)
+    app.config.setdefault('QUERY_BUDGET_STRICT', False)
+    if not app.config['INSTRUMENTATION_ENABLED']:
+        return
+
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    slow_request = app.config['SLOW_REQUEST_MS'] / 1000
+
+    with app.app_context():
+        instrument_engine(app, db.engine)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+        g.query_seconds = 0.0
+
+    @app.after_request
+    def record_request(response):
+        if 'request_started' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe_request(request.method, endpoint, response.status_code, elapsed, g.query_count)
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={g.query_seconds * 1000:.1f};desc="{g.query_count} queries"'
+        )
+
+        if elapsed >= slow_request:
+            app.logger.warning(
+                'Slow request (%.0f ms, %d queries): %s %s',
+                elapsed * 1000, g.query_count, request.method, request.full_path
+            )
+
+        view = app.view_functions.get(request.endpoint)
+        budget = getattr(view, 'query_budget', None)
+        if budget is not None and g.query_count > budget:
+            message = f'{request.method} {request.path} issued {g.query_count} queries (budget {budget})'
+            if app.config['QUERY_BUDGET_STRICT']:
+                raise QueryBudgetExceeded(message)
+            app.logger.warning(message)
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
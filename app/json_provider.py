@@ -0,0 +1,48 @@
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used instead
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson when installed and the stdlib otherwise.
+
+    Datetimes and dates are encoded as ISO 8601 by both paths, so handlers
+    and column-only serializers can hand raw values to jsonify.
+    """
+
+    sort_keys = False
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+            except TypeError:
+                pass  # e.g. integers wider than 64 bits; let the stdlib handle it
+        kwargs.setdefault('default', self.default)
+        kwargs.setdefault('sort_keys', self.sort_keys)
+        kwargs.setdefault('ensure_ascii', self.ensure_ascii)
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if self._app.debug:
+            return self._app.response_class(
+                super().dumps(obj, default=self.default, indent=2, sort_keys=self.sort_keys) + '\n',
+                mimetype=self.mimetype
+            )
+        return self._app.response_class(self.dumps(obj) + '\n', mimetype=self.mimetype)
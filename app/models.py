@@ -1,10 +1,38 @@
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.services import password_service
+from app.fields import build_fields
 from datetime import datetime
 import uuid
 
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+class ColumnSerializerMixin:
+    """Column-only serialization for list endpoints.
+    
+    Values are returned raw (datetimes included) and encoded by the app's
+    JSON provider, skipping per-field Python formatting.
+    """
+    
+    @classmethod
+    def json_query(cls):
+        """Query returning plain rows of every column, without building ORM objects"""
+        return db.session.query(*cls.__table__.columns)
+    
+    @staticmethod
+    def row_to_json(row):
+        return row._asdict()
+    
+    def to_json(self):
+        return {column.key: getattr(self, column.key) for column in self.__table__.columns}
+
+
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     email = db.Column(db.String(100), unique=True, nullable=False)
@@ -47,10 +75,14 @@ class User(db.Model):
     events = db.relationship('Event', backref='creator', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_service.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_service.verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """True when the stored hash predates the configured method or cost"""
+        return password_service.needs_rehash(self.password_hash)
     
     def get_display_name(self):
         """Return display name or construct from first/last name"""
@@ -64,16 +96,32 @@ class User(db.Model):
             return self.email.split('@')[0]
     
     def update_bags_stats(self, won, tournament_win=False):
-        """Update bags game statistics"""
-        if won:
-            self.bags_wins += 1
-        else:
-            self.bags_losses += 1
-        
+        """Queue atomic bags stat increments; committed with the caller's transaction"""
+        deltas = {'bags_wins' if won else 'bags_losses': 1}
         if tournament_win:
-            self.bags_tournament_wins += 1
+            deltas['bags_tournament_wins'] = 1
+        User.apply_bags_increments({self.id: deltas})
+        db.session.expire(self, list(deltas))
+    
+    @staticmethod
+    def apply_bags_increments(increments):
+        """Apply {user_id: {'bags_wins': n, ...}} as atomic server-side increments.
+        
+        One UPDATE ... WHERE id IN for all users, with a CASE per column
+        picking each user's delta, so a batch costs one statement.
+        """
+        columns = sorted({column for deltas in increments.values() for column, n in deltas.items() if n})
+        if not columns:
+            return
         
-        db.session.commit()
+        values = {}
+        for column in columns:
+            deltas = {user_id: d[column] for user_id, d in increments.items() if d.get(column)}
+            values[getattr(User, column)] = getattr(User, column) + db.case(deltas, value=User.id, else_=0)
+        user_ids = [user_id for user_id, deltas in increments.items() if any(deltas.values())]
+        db.session.execute(
+            db.update(User).where(User.id.in_(user_ids)).values(values).execution_options(synchronize_session=False)
+        )
     
     def get_bags_win_rate(self):
         """Calculate win rate percentage"""
@@ -82,39 +130,53 @@ class User(db.Model):
             return 0
         return round((self.bags_wins / total_games) * 100, 1)
     
-    def to_dict(self, include_stats=False):
-        data = {
-            'id': self.id,
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'display_name': self.get_display_name(),
-            'is_admin': self.is_admin,
-            'is_active': self.is_active,
-            'avatar_url': self.avatar_url or self.google_picture_url,
-            'bio': self.bio,
-            'favorite_band': self.favorite_band,
-            'beach_member_since': self.beach_member_since.isoformat() if self.beach_member_since else None,
-            'created_at': self.created_at.isoformat(),
-            'last_login': self.last_login.isoformat() if self.last_login else None
+    @staticmethod
+    def count_events_by_user():
+        """Map user id to number of events created, in one grouped query"""
+        rows = db.session.query(Event.created_by_id, db.func.count(Event.id)).group_by(Event.created_by_id)
+        return dict(rows.all())
+    
+    STATS_FIELDS = {
+        'bags_wins', 'bags_losses', 'bags_win_rate', 'bags_tournament_wins',
+        'events_created', 'sasquatch_sightings'
+    }
+    
+    def to_dict(self, include_stats=False, fields=None):
+        getters = {
+            'id': lambda: self.id,
+            'email': lambda: self.email,
+            'first_name': lambda: self.first_name,
+            'last_name': lambda: self.last_name,
+            'display_name': self.get_display_name,
+            'is_admin': lambda: self.is_admin,
+            'is_active': lambda: self.is_active,
+            'avatar_url': lambda: self.avatar_url or self.google_picture_url,
+            'bio': lambda: self.bio,
+            'favorite_band': lambda: self.favorite_band,
+            'beach_member_since': lambda: _iso(self.beach_member_since),
+            'created_at': lambda: self.created_at.isoformat(),
+            'last_login': lambda: _iso(self.last_login)
         }
         
         if include_stats:
-            data.update({
-                'bags_wins': self.bags_wins,
-                'bags_losses': self.bags_losses,
-                'bags_win_rate': self.get_bags_win_rate(),
-                'bags_tournament_wins': self.bags_tournament_wins,
-                'events_created': len(self.events),
-                'sasquatch_sightings': self.sasquatch_sightings
+            getters.update({
+                'bags_wins': lambda: self.bags_wins,
+                'bags_losses': lambda: self.bags_losses,
+                'bags_win_rate': self.get_bags_win_rate,
+                'bags_tournament_wins': lambda: self.bags_tournament_wins,
+                'events_created': lambda: self.events_created or 0,
+                'sasquatch_sightings': lambda: self.sasquatch_sightings
             })
         
-        return data
+        return build_fields(getters, fields)
 
 
 # Add a new model for Bags Game History
-class BagsGame(db.Model):
+class BagsGame(ColumnSerializerMixin, db.Model):
     __tablename__ = 'bags_games'
+    __table_args__ = (
+        db.Index('ix_bags_games_started_at_id', 'started_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     
@@ -145,24 +207,138 @@ class BagsGame(db.Model):
             delta = self.ended_at - self.started_at
             self.duration_minutes = int(delta.total_seconds() / 60)
     
+    def registered_participants(self):
+        """Yield (user_id, team) for every registered player in the game"""
+        for team, players in ((1, self.team1_players), (2, self.team2_players)):
+            for player in players or []:
+                player_id = player.get('id')
+                if player_id and player_id.startswith('user_'):
+                    yield player_id.replace('user_', ''), team
+    
+    def build_participants(self):
+        """Build participant index rows for this game"""
+        return [
+            BagsGameParticipant(
+                player_id=player_id,
+                started_at=self.started_at,
+                game_id=self.id,
+                team=team,
+                won=team == self.winning_team
+            )
+            for player_id, team in self.registered_participants()
+        ]
+    
+    def to_dict(self, fields=None):
+        return build_fields({
+            'id': lambda: self.id,
+            'team1_players': lambda: self.team1_players,
+            'team2_players': lambda: self.team2_players,
+            'team1_score': lambda: self.team1_score,
+            'team2_score': lambda: self.team2_score,
+            'winning_team': lambda: self.winning_team,
+            'game_type': lambda: self.game_type,
+            'tournament_id': lambda: self.tournament_id,
+            'tournament_round': lambda: self.tournament_round,
+            'started_at': lambda: self.started_at.isoformat(),
+            'ended_at': lambda: _iso(self.ended_at),
+            'duration_minutes': lambda: self.duration_minutes,
+            'location': lambda: self.location
+        }, fields)
+
+
+# Index of registered players per game so player history is a key lookup
+class BagsGameParticipant(db.Model):
+    __tablename__ = 'bags_game_participants'
+    
+    player_id = db.Column(db.String(36), primary_key=True)
+    started_at = db.Column(db.DateTime, primary_key=True)
+    game_id = db.Column(db.String(36), db.ForeignKey('bags_games.id', ondelete='CASCADE'), primary_key=True)
+    team = db.Column(db.Integer, nullable=False)  # 1 or 2
+    won = db.Column(db.Boolean, nullable=False)
+    
+    game = db.relationship('BagsGame', lazy='joined')
+    
+    @classmethod
+    def history_query(cls, player_id):
+        """Games for a player, newest first, served by the primary key"""
+        return cls.query.filter_by(player_id=player_id).order_by(
+            cls.started_at.desc(), cls.game_id.desc()
+        )
+
+
+# Current skill rating per registered player, maintained by rating_service
+class PlayerRating(db.Model):
+    __tablename__ = 'bags_player_ratings'
+    
+    player_id = db.Column(db.String(36), primary_key=True)
+    rating = db.Column(db.Float, nullable=False)
+    games_rated = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
     def to_dict(self):
         return {
-            'id': self.id,
-            'team1_players': self.team1_players,
-            'team2_players': self.team2_players,
-            'team1_score': self.team1_score,
-            'team2_score': self.team2_score,
-            'winning_team': self.winning_team,
-            'game_type': self.game_type,
-            'tournament_id': self.tournament_id,
-            'tournament_round': self.tournament_round,
-            'started_at': self.started_at.isoformat(),
-            'ended_at': self.ended_at.isoformat() if self.ended_at else None,
-            'duration_minutes': self.duration_minutes,
-            'location': self.location
+            'player_id': self.player_id,
+            'rating': round(self.rating, 1),
+            'games_rated': self.games_rated,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 
+# Rating after each game, so history charts read precomputed points
+class RatingSnapshot(db.Model):
+    __tablename__ = 'bags_rating_snapshots'
+    
+    player_id = db.Column(db.String(36), primary_key=True)
+    rated_at = db.Column(db.DateTime, primary_key=True)
+    game_id = db.Column(db.String(36), db.ForeignKey('bags_games.id', ondelete='CASCADE'), primary_key=True)
+    rating = db.Column(db.Float, nullable=False)
+    delta = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'game_id': self.game_id,
+            'rated_at': self.rated_at.isoformat(),
+            'rating': round(self.rating, 1),
+            'delta': round(self.delta, 1)
+        }
+
+
+# Per-player totals for one day, month or season (calendar year), kept by rollup_service
+class PlayerPeriodStats(db.Model):
+    __tablename__ = 'bags_player_period_stats'
+    
+    player_id = db.Column(db.String(36), primary_key=True)
+    period = db.Column(db.String(5), primary_key=True)  # 'day', 'month' or 'year'
+    period_start = db.Column(db.Date, primary_key=True)
+    games = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    points_for = db.Column(db.Integer, nullable=False, default=0)
+    points_against = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Per-season record of a player with (partner) or against (opponent) another player
+class PlayerMatchupStats(db.Model):
+    __tablename__ = 'bags_player_matchups'
+    
+    player_id = db.Column(db.String(36), primary_key=True)
+    other_id = db.Column(db.String(36), primary_key=True)
+    relation = db.Column(db.String(8), primary_key=True)  # 'partner' or 'opponent'
+    season = db.Column(db.Integer, primary_key=True)
+    games = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    points_for = db.Column(db.Integer, nullable=False, default=0)
+    points_against = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Change counter per cacheable collection, used for ETags when Redis is not configured
+class CollectionVersion(db.Model):
+    __tablename__ = 'collection_versions'
+    
+    name = db.Column(db.String(30), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    modified_at = db.Column(db.Integer, nullable=False, default=0)  # unix time
+
+
 # Add a new model for Tournaments
 class BagsTournament(db.Model):
     __tablename__ = 'bags_tournaments'
@@ -191,27 +367,37 @@ class BagsTournament(db.Model):
     # Created by
     creator_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'tournament_type': self.tournament_type,
-            'players': self.players,
-            'bracket': self.bracket,
-            'champion_id': self.champion_id,
-            'champion_name': self.champion_name,
-            'status': self.status,
-            'current_round': self.current_round,
-            'created_at': self.created_at.isoformat(),
-            'started_at': self.started_at.isoformat() if self.started_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
-            'creator_id': self.creator_id
-        }
+    # Optimistic lock: every write checks and bumps this
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    __mapper_args__ = {'version_id_col': version}
+    
+    def to_dict(self, fields=None):
+        # Only requested attributes are read, so columns deferred by the query stay unloaded
+        return build_fields({
+            'id': lambda: self.id,
+            'name': lambda: self.name,
+            'tournament_type': lambda: self.tournament_type,
+            'players': lambda: self.players,
+            'bracket': lambda: self.bracket,
+            'champion_id': lambda: self.champion_id,
+            'champion_name': lambda: self.champion_name,
+            'status': lambda: self.status,
+            'current_round': lambda: self.current_round,
+            'created_at': lambda: self.created_at.isoformat(),
+            'started_at': lambda: _iso(self.started_at),
+            'completed_at': lambda: _iso(self.completed_at),
+            'creator_id': lambda: self.creator_id,
+            'version': lambda: self.version
+        }, fields)
 
 
 # Original Event model
-class Event(db.Model):
+class Event(ColumnSerializerMixin, db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_date_id', 'date', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     title = db.Column(db.String(200), nullable=False)
@@ -221,13 +407,13 @@ class Event(db.Model):
     created_by_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'description': self.description,
-            'date': self.date.isoformat(),
-            'location': self.location,
-            'created_by_id': self.created_by_id,
-            'created_at': self.created_at.isoformat()
-        }
\ No newline at end of file
+    def to_dict(self, fields=None):
+        return build_fields({
+            'id': lambda: self.id,
+            'title': lambda: self.title,
+            'description': lambda: self.description,
+            'date': lambda: self.date.isoformat(),
+            'location': lambda: self.location,
+            'created_by_id': lambda: self.created_by_id,
+            'created_at': lambda: self.created_at.isoformat()
+        }, fields)
\ No newline at end of file
@@ -0,0 +1,43 @@
+from app import db
+from datetime import datetime
+import base64
+import json
+
+def encode_cursor(sort_value, row_id):
+    """Opaque cursor for the last row of a page"""
+    raw = json.dumps([sort_value.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (sort_value, row_id) from a cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), str(row_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def keyset_page(query, sort_column, id_column, cursor=None, limit=50, key=None):
+    """Fetch one page ordered by (sort_column, id_column) descending.
+
+    Seeks past the cursor instead of using OFFSET, so every page costs one
+    index range scan regardless of depth. ``key`` maps a row to its
+    (sort, id) values when they are not attributes named after the columns.
+    Returns (rows, next_cursor). Limits below 1 are treated as 1.
+    """
+    limit = max(limit, 1)
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(
+            sort_column <= sort_value,
+            db.or_(sort_column < sort_value, id_column < row_id)
+        )
+
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    if key is None:
+        key = lambda row: (getattr(row, sort_column.key), getattr(row, id_column.key))
+    return rows, encode_cursor(*key(rows[-1]))
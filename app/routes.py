@@ -1,6 +1,11 @@
 from flask import Blueprint, jsonify, request, current_app
 from app import db
 from app.models import User, Event
+from app.pagination import keyset_page
+from app.fields import pick_fields, requested_fields
+from app.services import identity_service
+from app.http_cache import conditional_get
+from app.instrumentation import query_budget
 from datetime import datetime
 import jwt
 from functools import wraps
@@ -19,9 +24,12 @@ def token_required(f):
         try:
             token = token.split(' ')[1]  # Remove 'Bearer ' prefix
             data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
+            # Cached identity instead of loading the full User row
+            current_user = identity_service.get_identity(data['user_id'])
         except:
             return jsonify({'message': 'Token is invalid'}), 401
+        if not current_user or not current_user.is_active:
+            return jsonify({'message': 'Token is invalid'}), 401
         return f(current_user, *args, **kwargs)
     return decorated
 
@@ -29,10 +37,78 @@ def token_required(f):
 def health():
     return jsonify({'status': 'ok', 'message': 'Edgewater API is running'})
 
+def _events_variant():
+    # upcoming=true moves with the clock, so it is always served fresh
+    return None if request.args.get('upcoming', 'false').lower() == 'true' else ''
+
+def _summary_variant():
+    # Without ?month= the summary is for the current month
+    return request.args.get('month') or datetime.utcnow().strftime('%Y-%m')
+
 @main.route('/api/events')
+@conditional_get('events', vary=_events_variant)
+@query_budget(3)
 def get_events():
-    events = Event.query.order_by(Event.date.desc()).all()
-    return jsonify({'events': [event.to_dict() for event in events]})
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    
+    # Column rows serialized by the JSON provider; same payload as Event.to_dict()
+    query = Event.json_query()
+    fields = requested_fields()
+    
+    # Calendar windows: ascending date order, served by the (date, id) index
+    date_from = request.args.get('from')
+    date_to = request.args.get('to')
+    upcoming = request.args.get('upcoming', 'false').lower() == 'true'
+    if date_from or date_to or upcoming:
+        try:
+            if date_from:
+                query = query.filter(Event.date >= datetime.fromisoformat(date_from))
+            if date_to:
+                query = query.filter(Event.date < datetime.fromisoformat(date_to))
+        except ValueError:
+            return jsonify({'error': 'from and to must be ISO dates'}), 400
+        if upcoming:
+            query = query.filter(Event.date >= datetime.utcnow())
+        
+        events = query.order_by(Event.date.asc(), Event.id.asc()).limit(min(max(limit or 500, 1), 500)).all()
+        return jsonify({'events': [pick_fields(Event.row_to_json(event), fields) for event in events]})
+    
+    if limit is None and cursor is None:
+        events = query.order_by(Event.date.desc(), Event.id.desc()).all()
+        return jsonify({'events': [pick_fields(Event.row_to_json(event), fields) for event in events]})
+    
+    # Keyset pagination on (date, id) for infinite scroll
+    try:
+        events, next_cursor = keyset_page(query, Event.date, Event.id, cursor, min(limit or 50, 200))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = {'events': [pick_fields(Event.row_to_json(event), fields) for event in events], 'next_cursor': next_cursor}
+    if request.args.get('include_total', 'false').lower() == 'true':
+        response['total'] = Event.query.count()
+    return jsonify(response)
+
+@main.route('/api/events/summary')
+@conditional_get('events', vary=_summary_variant)
+@query_budget(3)
+def get_events_summary():
+    """Per-day event counts for one month (?month=YYYY-MM) from a single grouped query"""
+    try:
+        start = datetime.strptime(request.args.get('month') or datetime.utcnow().strftime('%Y-%m'), '%Y-%m')
+    except ValueError:
+        return jsonify({'error': 'month must be YYYY-MM'}), 400
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    
+    day = db.func.date(Event.date)
+    rows = db.session.query(day, db.func.count(Event.id)).filter(
+        Event.date >= start, Event.date < end
+    ).group_by(day).all()
+    
+    return jsonify({
+        'month': start.strftime('%Y-%m'),
+        'days': {str(date): count for date, count in rows}
+    })
 
 @main.route('/api/events', methods=['POST'])
 @token_required
@@ -48,6 +124,10 @@ def create_event(current_user):
     )
     
     db.session.add(event)
+    # Atomic counter so stats never need to load the user's events
+    User.query.filter_by(id=current_user.id).update(
+        {User.events_created: User.events_created + 1}, synchronize_session=False
+    )
     db.session.commit()
     
     return jsonify({
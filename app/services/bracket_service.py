@@ -0,0 +1,103 @@
+import copy
+import math
+
+# Standard seeding so the top seeds can only meet in the final
+SEED_ORDER = {
+    4: [(1, 4), (2, 3)],
+    8: [(1, 8), (4, 5), (2, 7), (3, 6)]
+}
+
+def generate_bracket(players):
+    """Single-elimination bracket for 4 or 8 players, seeded in list order.
+
+    Each match is a flat dict so one result only touches the played match
+    and the match its winner advances into.
+    """
+    size = len(players)
+    if size not in SEED_ORDER:
+        raise ValueError('Brackets are generated for 4 or 8 players')
+
+    rounds = int(math.log2(size))
+    bracket = []
+    for round_number in range(1, rounds + 1):
+        for match_number in range(1, size // 2 ** round_number + 1):
+            final = round_number == rounds
+            bracket.append({
+                'id': f'r{round_number}m{match_number}',
+                'round': round_number,
+                'match': match_number,
+                'player1': None,
+                'player2': None,
+                'score1': None,
+                'score2': None,
+                'winner_id': None,
+                'next_match': None if final else f'r{round_number + 1}m{(match_number + 1) // 2}',
+                'next_slot': None if final else 2 - match_number % 2
+            })
+
+    for index, (seed1, seed2) in enumerate(SEED_ORDER[size]):
+        bracket[index]['player1'] = players[seed1 - 1]
+        bracket[index]['player2'] = players[seed2 - 1]
+    return bracket
+
+class UnsupportedBracket(ValueError):
+    """The stored bracket is not in the generated format (e.g. built by a client)"""
+
+
+MATCH_KEYS = ('id', 'round', 'match', 'player1', 'player2', 'score1', 'score2', 'winner_id', 'next_match', 'next_slot')
+
+def _check_format(bracket):
+    """Raise UnsupportedBracket unless bracket looks like generate_bracket output"""
+    if not isinstance(bracket, list) or not all(isinstance(match, dict) for match in bracket):
+        raise UnsupportedBracket('Bracket is not a list of matches')
+    if not all(all(key in match for key in MATCH_KEYS) for match in bracket):
+        raise UnsupportedBracket('Bracket matches are missing fields')
+    ids = {match['id'] for match in bracket if isinstance(match['id'], str)}
+    if len(ids) != len(bracket):
+        raise UnsupportedBracket('Bracket match ids must be unique strings')
+    for match in bracket:
+        if not isinstance(match['round'], int):
+            raise UnsupportedBracket('Bracket rounds must be integers')
+        if any(player is not None and not isinstance(player, dict) for player in (match['player1'], match['player2'])):
+            raise UnsupportedBracket('Bracket players must be objects')
+        if match['next_match'] is not None and (match['next_match'] not in ids or match['next_slot'] not in (1, 2)):
+            raise UnsupportedBracket('Bracket matches must advance into another match slot')
+
+def record_result(bracket, match_id, score1, score2):
+    """Record one match and advance the winner.
+
+    Returns (new_bracket, changed_matches, champion) where champion is the
+    winning player once the final is decided, else None. Raises
+    UnsupportedBracket for brackets this service did not generate, and
+    ValueError for results that cannot be recorded.
+    """
+    _check_format(bracket)
+    bracket = copy.deepcopy(bracket)
+    matches = {match['id']: match for match in bracket}
+
+    match = matches.get(match_id)
+    if not match:
+        raise ValueError('Match not found')
+    if not match['player1'] or not match['player2']:
+        raise ValueError('Match is not ready to be played')
+    if score1 == score2:
+        raise ValueError('Bags matches cannot end in a tie')
+
+    next_match = matches.get(match['next_match'])
+    if match['winner_id'] and next_match and next_match['winner_id']:
+        raise ValueError('The following match has already been played')
+
+    winner = match['player1'] if score1 > score2 else match['player2']
+    match.update(score1=score1, score2=score2, winner_id=winner.get('id'))
+    changed = [match]
+
+    if next_match:
+        next_match[f"player{match['next_slot']}"] = winner
+        changed.append(next_match)
+        return bracket, changed, None
+    return bracket, changed, winner
+
+def current_round(bracket):
+    """Lowest round that still has an unplayed match"""
+    pending = [match['round'] for match in bracket if not match['winner_id']]
+    return min(pending) if pending else max(match['round'] for match in bracket)
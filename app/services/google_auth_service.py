@@ -1,26 +1,230 @@
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from google.auth import exceptions as google_exceptions
+from google.auth import jwt as google_jwt
+from app import db
+from datetime import datetime, timedelta
 from flask import current_app
+from flask_jwt_extended import create_access_token
+import asyncio
+import re
+import threading
+import time
+import requests
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ['accounts.google.com', 'https://accounts.google.com']
+DEFAULT_CERTS_MAX_AGE = 3600  # Used when Google sends no Cache-Control max-age
+REFRESH_MARGIN = 0.1  # Refresh in the background during the last 10% of the lifetime
+MIN_FORCED_REFRESH_INTERVAL = 60  # Seconds between refetches for unknown key ids
+
+# One pooled HTTP session per process instead of a new one per login
+_session = requests.Session()
+
+def fetch_google_certs():
+    """Fetch Google's signing certificates, returning (certs, max_age_seconds)"""
+    response = _session.get(GOOGLE_CERTS_URL, timeout=5)
+    response.raise_for_status()
+
+    match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+    max_age = int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+    return response.json(), max_age
+
+_async_client = None
+
+async def fetch_google_certs_async():
+    """fetch_google_certs over a pooled httpx.AsyncClient, for the ASGI handlers"""
+    global _async_client
+    import httpx
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(timeout=5)
+    response = await _async_client.get(GOOGLE_CERTS_URL)
+    response.raise_for_status()
+
+    match = re.search(r'max-age=(\d+)', response.headers.get('Cache-Control', ''))
+    max_age = int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+    return response.json(), max_age
+
+
+class CertCache:
+    """Process-wide cache of Google's certificate set honouring Cache-Control.
+
+    Forced refreshes (a token signed with a key we do not know) are rate
+    limited to one per MIN_FORCED_REFRESH_INTERVAL, and concurrent callers
+    needing a fetch share the one in flight, so tokens with made-up key ids
+    cannot turn into one Google request each.
+    """
+
+    def __init__(self, fetcher=fetch_google_certs, async_fetcher=fetch_google_certs_async):
+        self.fetcher = fetcher
+        self.async_fetcher = async_fetcher
+        self.certs = None
+        self.fetched_at = 0
+        self.max_age = 0
+        self.attempted_at = None  # Start of the last foreground fetch
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._async_fetch_lock = None
+        self._refreshing = False
+
+    def set_fetcher(self, fetcher, async_fetcher=None):
+        """Swap the certificate source (tests, offline environments, benchmarks).
+
+        Without an async_fetcher the async path runs fetcher in a thread.
+        """
+        with self._lock:
+            self.fetcher = fetcher
+            self.async_fetcher = async_fetcher
+            self.certs = None
+            self.attempted_at = None
+
+    def _store(self, certs, max_age):
+        with self._lock:
+            self.certs = certs
+            self.max_age = max_age
+            self.fetched_at = time.monotonic()
+
+    def _refresh(self):
+        self._store(*self.fetcher())
+
+    def _background_refresh(self):
+        try:
+            self._refresh()
+        except Exception:
+            # Keep serving the current set; the next call past expiry refetches
+            pass
+        finally:
+            self._refreshing = False
+
+    def _needs_fetch(self, force):
+        now = time.monotonic()
+        if self.certs is None or now - self.fetched_at >= self.max_age:
+            return True
+        # Within the interval an unknown key id is rejected with the current set
+        return force and (self.attempted_at is None or now - self.attempted_at >= MIN_FORCED_REFRESH_INTERVAL)
+
+    def _start_background_refresh(self):
+        if time.monotonic() - self.fetched_at >= self.max_age * (1 - REFRESH_MARGIN) and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def get(self, force=False):
+        if self._needs_fetch(force):
+            seen = self.attempted_at
+            with self._fetch_lock:
+                # Callers that waited for another fetch use its result
+                if self.attempted_at == seen:
+                    self.attempted_at = time.monotonic()
+                    self._refresh()
+        else:
+            self._start_background_refresh()
+        return self.certs
+
+    async def aget(self, force=False):
+        """get() for async handlers; a refetch awaits the HTTP call instead of blocking"""
+        if self._needs_fetch(force):
+            seen = self.attempted_at
+            if self._async_fetch_lock is None:
+                self._async_fetch_lock = asyncio.Lock()
+            async with self._async_fetch_lock:
+                if self.attempted_at == seen:
+                    self.attempted_at = time.monotonic()
+                    if self.async_fetcher:
+                        self._store(*await self.async_fetcher())
+                    else:
+                        self._store(*await asyncio.to_thread(self.fetcher))
+        else:
+            self._start_background_refresh()
+        return self.certs
+
+
+cert_cache = CertCache()
+
+def _decode(token, certs):
+    idinfo = google_jwt.decode(token, certs=certs, audience=current_app.config['GOOGLE_CLIENT_ID'])
+    if idinfo.get('iss') not in GOOGLE_ISSUERS:
+        raise ValueError('Wrong issuer')
+    return idinfo
+
+def _user_info(idinfo):
+    """Extract user information"""
+    return {
+        'sub': idinfo['sub'],  # Keep as 'sub' to match auth_routes.py
+        'email': idinfo['email'],
+        'name': idinfo.get('name', ''),
+        'picture': idinfo.get('picture', ''),
+        'given_name': idinfo.get('given_name', ''),
+        'family_name': idinfo.get('family_name', '')
+    }
 
 def verify_google_token(token):
     """Verify Google OAuth token and return user info"""
     try:
-        # Verify the token
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            requests.Request(), 
-            current_app.config['GOOGLE_CLIENT_ID']
-        )
-        
-        # Extract user information
-        return {
-            'sub': idinfo['sub'],  # Keep as 'sub' to match auth_routes.py
-            'email': idinfo['email'],
-            'name': idinfo.get('name', ''),
-            'picture': idinfo.get('picture', ''),
-            'given_name': idinfo.get('given_name', ''),
-            'family_name': idinfo.get('family_name', '')
-        }
-    except ValueError:
+        # Verify the token against the cached certificate set
+        try:
+            idinfo = _decode(token, cert_cache.get())
+        except ValueError as e:
+            if 'Certificate for key id' not in str(e):
+                raise
+            # Google rotated its keys before our copy expired
+            idinfo = _decode(token, cert_cache.get(force=True))
+
+        return _user_info(idinfo)
+    except (ValueError, google_exceptions.GoogleAuthError):
         # Invalid token
-        return None
\ No newline at end of file
+        return None
+
+async def verify_google_token_async(token):
+    """verify_google_token for async handlers; only a certificate refetch does I/O"""
+    try:
+        try:
+            idinfo = _decode(token, await cert_cache.aget())
+        except ValueError as e:
+            if 'Certificate for key id' not in str(e):
+                raise
+            idinfo = _decode(token, await cert_cache.aget(force=True))
+        return _user_info(idinfo)
+    except (ValueError, google_exceptions.GoogleAuthError):
+        return None
+
+def sign_in(session, google_user_info, admin_email):
+    """Find, link or create the user for a verified Google identity and stamp the login.
+
+    Takes the session so Flask views pass db.session and async views run it
+    through AsyncSession.run_sync; the caller commits.
+    """
+    from app.models import User
+    user = session.execute(db.select(User).filter_by(google_id=google_user_info['sub'])).scalar_one_or_none()
+    
+    if not user:
+        # Check if user exists with this email
+        user = session.execute(db.select(User).filter_by(email=google_user_info['email'])).scalar_one_or_none()
+        
+        if user:
+            # Link Google account to existing user
+            user.google_id = google_user_info['sub']
+            user.google_picture_url = google_user_info.get('picture')
+        else:
+            user = User(
+                email=google_user_info['email'],
+                google_id=google_user_info['sub'],
+                first_name=google_user_info.get('given_name'),
+                last_name=google_user_info.get('family_name'),
+                google_picture_url=google_user_info.get('picture'),
+                # Set admin if email matches
+                is_admin=google_user_info['email'] == admin_email
+            )
+            session.add(user)
+    
+    # Update last login and picture
+    user.last_login = datetime.utcnow()
+    if google_user_info.get('picture'):
+        user.google_picture_url = google_user_info.get('picture')
+    return user
+
+def login_payload(user):
+    """Access token and profile returned after a Google sign-in"""
+    access_token = create_access_token(
+        identity=user.id,
+        expires_delta=timedelta(days=30),
+        additional_claims={'is_admin': user.is_admin}
+    )
+    return {'access_token': access_token, 'user': user.to_dict(include_stats=True)}
@@ -0,0 +1,83 @@
+from app import db
+from app.cache import TTLCache
+from collections import namedtuple
+from flask import current_app, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from functools import wraps
+
+Identity = namedtuple('Identity', ['id', 'is_active', 'is_admin'])
+
+_cache = TTLCache()
+
+def _load_identity(session, user_id):
+    from app.models import User
+    row = session.execute(
+        db.select(User.id, User.is_active, User.is_admin).where(User.id == user_id)
+    ).first()
+    return Identity(row.id, bool(row.is_active), bool(row.is_admin)) if row else None
+
+def _remember(identity):
+    _cache.set(identity.id, identity, ttl=current_app.config.get('AUTH_IDENTITY_CACHE_TTL', 60))
+    return identity
+
+def get_identity(user_id):
+    """Cached id/active/admin status for a user, or None if the user does not exist"""
+    identity = _cache.get(user_id)
+    if identity is None:
+        identity = _load_identity(db.session, user_id)
+        if identity is None:
+            return None
+        _remember(identity)
+    return identity
+
+async def get_identity_async(user_id):
+    """get_identity for async handlers, loading misses through an async session"""
+    identity = _cache.get(user_id)
+    if identity is None:
+        async with current_app.extensions['async_session']() as session:
+            identity = await session.run_sync(_load_identity, user_id)
+        if identity is None:
+            return None
+        _remember(identity)
+    return identity
+
+def is_active_admin(identity):
+    return bool(identity and identity.is_active and identity.is_admin)
+
+def invalidate(user_id):
+    """Drop a cached identity after its status or profile changed"""
+    _cache.delete(user_id)
+
+def admin_required(f):
+    """Require a JWT for an active admin without loading the User row.
+
+    Status comes from the identity cache rather than the token's is_admin
+    claim alone, so promotions and demotions apply before the token expires.
+    """
+    @wraps(f)
+    @jwt_required()
+    def decorated(*args, **kwargs):
+        if not is_active_admin(get_identity(get_jwt_identity())):
+            return jsonify({'error': 'Unauthorized'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def async_jwt_required(locations=None):
+    """@jwt_required for async views served from app.asgi"""
+    def decorator(f):
+        @wraps(f)
+        async def decorated(*args, **kwargs):
+            verify_jwt_in_request(locations=locations)
+            return await f(*args, **kwargs)
+        return decorated
+    return decorator
+
+def async_admin_required(f):
+    """admin_required for async views served from app.asgi"""
+    @wraps(f)
+    @async_jwt_required()
+    async def decorated(*args, **kwargs):
+        if not is_active_admin(await get_identity_async(get_jwt_identity())):
+            return jsonify({'error': 'Unauthorized'}), 403
+        return await f(*args, **kwargs)
+    return decorated
@@ -0,0 +1,169 @@
+from app import http_cache
+from app.services.redis_service import get_redis
+import bisect
+import json
+import threading
+
+SCORES_KEY = 'leaderboard:scores'
+ENTRIES_KEY = 'leaderboard:entries'
+READY_KEY = 'leaderboard:ready'
+
+def _score(wins, win_rate):
+    """Rank by wins, then win rate (win_rate has one decimal and is at most 100)"""
+    return wins * 10000 + int(round(win_rate * 10))
+
+def _entry(user):
+    """Leaderboard row for a user, stored so reads never touch the users table"""
+    return {
+        'id': user.id,
+        'name': user.get_display_name(),
+        'wins': user.bags_wins,
+        'losses': user.bags_losses,
+        'games_played': user.bags_wins + user.bags_losses,
+        'win_rate': user.get_bags_win_rate(),
+        'tournament_wins': user.bags_tournament_wins,
+        'avatar_url': user.avatar_url or user.google_picture_url
+    }
+
+
+class RedisLeaderboard:
+    """Leaderboard kept in a Redis sorted set with entries in a hash"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def is_loaded(self):
+        return bool(self.client.exists(READY_KEY))
+
+    def load(self, entries):
+        pipe = self.client.pipeline()
+        pipe.delete(SCORES_KEY, ENTRIES_KEY)
+        for entry in entries:
+            pipe.zadd(SCORES_KEY, {entry['id']: _score(entry['wins'], entry['win_rate'])})
+            pipe.hset(ENTRIES_KEY, entry['id'], json.dumps(entry))
+        pipe.set(READY_KEY, 1)
+        pipe.execute()
+
+    def upsert(self, entry):
+        pipe = self.client.pipeline()
+        pipe.zadd(SCORES_KEY, {entry['id']: _score(entry['wins'], entry['win_rate'])})
+        pipe.hset(ENTRIES_KEY, entry['id'], json.dumps(entry))
+        pipe.execute()
+
+    def top(self, limit):
+        ids = self.client.zrevrange(SCORES_KEY, 0, limit - 1)
+        if not ids:
+            return []
+        return [json.loads(raw) for raw in self.client.hmget(ENTRIES_KEY, ids) if raw]
+
+    def rank(self, user_id):
+        pipe = self.client.pipeline()
+        pipe.zrevrank(SCORES_KEY, user_id)
+        pipe.hget(ENTRIES_KEY, user_id)
+        rank, raw = pipe.execute()
+        if rank is None or raw is None:
+            return None
+        return dict(json.loads(raw), rank=rank + 1)
+
+
+class MemoryLeaderboard:
+    """In-process fallback: a sorted list searched with bisect.
+
+    Every worker holds its own copy, tagged with the shared 'leaderboard'
+    collection version it was built at, and rebuilds it when that version
+    moves so it never serves rankings older than its ETag.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.order = []  # (-score, user_id), ascending
+        self.entries = {}
+
+    def is_loaded(self):
+        return self.version is not None
+
+    def load(self, entries, version):
+        with self.lock:
+            self.entries = {entry['id']: entry for entry in entries}
+            self.order = sorted((-_score(e['wins'], e['win_rate']), e['id']) for e in entries)
+            self.version = version
+
+    def upsert(self, entry):
+        with self.lock:
+            old = self.entries.get(entry['id'])
+            if old:
+                key = (-_score(old['wins'], old['win_rate']), old['id'])
+                index = bisect.bisect_left(self.order, key)
+                if index < len(self.order) and self.order[index] == key:
+                    del self.order[index]
+            bisect.insort(self.order, (-_score(entry['wins'], entry['win_rate']), entry['id']))
+            self.entries[entry['id']] = entry
+
+    def top(self, limit):
+        with self.lock:
+            return [self.entries[user_id] for _, user_id in self.order[:limit]]
+
+    def rank(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if not entry:
+                return None
+            index = bisect.bisect_left(self.order, (-_score(entry['wins'], entry['win_rate']), user_id))
+            return dict(entry, rank=index + 1)
+
+
+_memory_board = MemoryLeaderboard()
+
+def _entries():
+    from app import db
+    from app.models import User
+    users = User.query.filter(db.or_(User.bags_wins > 0, User.bags_losses > 0)).all()
+    return [_entry(user) for user in users]
+
+def _board():
+    client = get_redis()
+    if client:
+        board = RedisLeaderboard(client)
+        if not board.is_loaded():
+            # Cold start: build once from the users table
+            board.load(_entries())
+            http_cache.bump('leaderboard')
+        return board
+    
+    # Read the version before the users, so the copy is at least as new as its tag
+    version, _ = http_cache.get_version('leaderboard')
+    if _memory_board.version != version:
+        _memory_board.load(_entries(), version)
+    return _memory_board
+
+def rebuild():
+    """Reload the ranking from the users table after bulk stat changes"""
+    client = get_redis()
+    if client:
+        RedisLeaderboard(client).load(_entries())
+    # Memory copies in every worker rebuild on the next read
+    http_cache.bump('leaderboard')
+
+def update_player(user):
+    """Re-rank a single player after their stats or profile changed.
+    
+    Returns True when the ranking changed; the caller then bumps the
+    'leaderboard' collection once for all the players it updated.
+    """
+    if not (user.bags_wins or user.bags_losses):
+        return False
+    client = get_redis()
+    board = RedisLeaderboard(client) if client else _memory_board
+    # A board that was never built picks the player up when it is
+    if board.is_loaded():
+        board.upsert(_entry(user))
+    return True
+
+def get_top(limit=50):
+    """Top players, best first"""
+    return _board().top(limit)
+
+def get_rank(user_id):
+    """Leaderboard entry for a player with their 1-based rank, or None if unranked"""
+    return _board().rank(user_id)
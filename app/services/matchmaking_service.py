@@ -0,0 +1,119 @@
+from app import db
+from app.cache import TTLCache
+from app.models import User, PlayerRating
+from app.services import waitlist_service
+from app.services.rating_service import INITIAL_RATING, expected_score
+from flask import current_app
+import math
+
+MAX_WINDOW = 32
+# Rating points a match may give up to pick a player one place earlier in the queue
+QUEUE_WEIGHT = 5.0
+
+_strengths = TTLCache(maxsize=5000)
+
+def _record_strength(wins, losses):
+    """Elo-equivalent strength of a win/loss record, smoothed toward even for few games"""
+    rate = (wins + 1) / (wins + losses + 2)
+    return INITIAL_RATING + 400 * math.log10(rate / (1 - rate))
+
+def get_strengths(player_ids):
+    """Strength per waitlist id: stored rating, else the win/loss record, else the initial rating.
+
+    Registered players are looked up with at most two IN queries and cached
+    briefly, so repeated proposals over the same queue skip the database.
+    """
+    strengths = {}
+    missing = []
+    for player_id in player_ids:
+        cached = _strengths.get(player_id)
+        if cached is not None:
+            strengths[player_id] = cached
+        elif player_id.startswith('user_'):
+            missing.append(player_id.replace('user_', ''))
+        else:
+            strengths[player_id] = INITIAL_RATING
+
+    if missing:
+        found = {
+            row.player_id: row.rating for row in
+            db.session.query(PlayerRating.player_id, PlayerRating.rating).filter(PlayerRating.player_id.in_(missing))
+        }
+        unrated = [user_id for user_id in missing if user_id not in found]
+        if unrated:
+            for row in db.session.query(User.id, User.bags_wins, User.bags_losses).filter(User.id.in_(unrated)):
+                found[row.id] = _record_strength(row.bags_wins or 0, row.bags_losses or 0)
+
+        ttl = current_app.config.get('MATCHMAKING_STRENGTH_CACHE_TTL', 30)
+        for user_id in missing:
+            strength = found.get(user_id, INITIAL_RATING)
+            strengths['user_' + user_id] = strength
+            _strengths.set('user_' + user_id, strength, ttl=ttl)
+    return strengths
+
+def best_split(values):
+    """Most even 2v2 split of four strengths as (team1 indexes, team2 indexes, gap).
+
+    With the four sorted, pairing the strongest with the weakest is always
+    the most even of the three possible splits, so no search is needed.
+    """
+    order = sorted(range(4), key=lambda index: values[index])
+    team1 = (order[0], order[3])
+    team2 = (order[1], order[2])
+    gap = abs(values[order[0]] + values[order[3]] - values[order[1]] - values[order[2]]) / 2
+    return team1, team2, gap
+
+def find_match(strengths):
+    """Pick four of the waiting players (queue order) and split them 2v2.
+
+    The head of the queue is always included so nobody waits forever. Each
+    candidate costs its team-rating gap plus QUEUE_WEIGHT per place skipped;
+    loops stop as soon as the skipped places alone cost more than the best
+    match found, which keeps the search to a few thousand steps at most.
+    Returns (player indexes, team1 indexes, team2 indexes, gap) or None.
+    """
+    size = len(strengths)
+    if size < 4:
+        return None
+
+    best = None
+    best_cost = math.inf
+    # The first three players after the head are skipping nobody
+    baseline = 1 + 2 + 3
+    for i in range(1, size - 2):
+        if QUEUE_WEIGHT * (3 * i + 3 - baseline) >= best_cost:
+            break
+        for j in range(i + 1, size - 1):
+            if QUEUE_WEIGHT * (i + 2 * j + 1 - baseline) >= best_cost:
+                break
+            for k in range(j + 1, size):
+                penalty = QUEUE_WEIGHT * (i + j + k - baseline)
+                if penalty >= best_cost:
+                    break
+                picked = (0, i, j, k)
+                team1, team2, gap = best_split([strengths[index] for index in picked])
+                if gap + penalty < best_cost:
+                    best_cost = gap + penalty
+                    best = (picked, [picked[index] for index in team1], [picked[index] for index in team2], gap)
+    return best
+
+def propose_match(window=None):
+    """Balanced 2v2 proposal from the head of the waitlist, or None if fewer than four wait"""
+    window = max(min(window or current_app.config.get('MATCHMAKING_WINDOW', 12), MAX_WINDOW), 1)
+    waiting = waitlist_service.get_waitlist(window)
+    strengths = get_strengths([player['id'] for player in waiting])
+    values = [strengths[player['id']] for player in waiting]
+
+    match = find_match(values)
+    if match is None:
+        return None
+
+    _, team1, team2, gap = match
+    rating1 = sum(values[index] for index in team1) / 2
+    rating2 = sum(values[index] for index in team2) / 2
+    return {
+        'team1_players': [dict(waiting[index], rating=round(values[index], 1)) for index in team1],
+        'team2_players': [dict(waiting[index], rating=round(values[index], 1)) for index in team2],
+        'rating_gap': round(gap, 1),
+        'team1_win_probability': round(expected_score(rating1, rating2), 3)
+    }
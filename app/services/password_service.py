@@ -0,0 +1,47 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+import functools
+import threading
+
+_executors = {}
+_lock = threading.Lock()
+
+def _executor():
+    """Bounded pool that caps how many hashes run at once.
+
+    The calling request thread still waits for its hash, so this limits CPU
+    and memory use under a burst of logins; it does not free the worker.
+    """
+    kind = current_app.config.get('PASSWORD_HASH_EXECUTOR', 'thread')
+    workers = current_app.config.get('PASSWORD_HASH_WORKERS', 4)
+    key = (kind, workers)
+    with _lock:
+        if key not in _executors:
+            pool_class = ProcessPoolExecutor if kind == 'process' else ThreadPoolExecutor
+            _executors[key] = pool_class(max_workers=workers)
+        return _executors[key]
+
+def _method():
+    return current_app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+
+@functools.lru_cache(maxsize=None)
+def _canonical_method(method):
+    """Method prefix Werkzeug stores for a configured method, defaults filled in"""
+    return generate_password_hash('', method).split('$', 1)[0]
+
+def hash_password(password):
+    """Hash with the configured method and cost in the hashing pool (blocks until done)"""
+    return _executor().submit(generate_password_hash, password, _method()).result()
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash in the hashing pool (blocks until done)"""
+    if not password_hash:
+        return False
+    return _executor().submit(check_password_hash, password_hash, password).result()
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with a different method or cost than configured"""
+    if not password_hash:
+        return False
+    return password_hash.split('$', 1)[0] != _canonical_method(_method())
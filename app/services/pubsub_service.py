@@ -0,0 +1,169 @@
+from app.services.redis_service import get_async_redis, get_redis
+from flask import current_app
+import asyncio
+import json
+import queue
+import threading
+
+CHANNEL_PREFIX = 'edgewater:'
+HEARTBEAT_SECONDS = 15
+
+
+class MemoryBroker:
+    """In-process pub/sub fallback; only reaches subscribers in this process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}  # channel -> set of queues
+
+    def publish(self, channel, message):
+        with self.lock:
+            targets = list(self.subscribers.get(channel, ()))
+        for target in targets:
+            try:
+                target.put_nowait((channel, message))
+            except queue.Full:
+                # Slow consumer; drop rather than block the publisher
+                pass
+
+    def listen(self, channels, timeout):
+        inbox = queue.Queue(maxsize=1000)
+        with self.lock:
+            for channel in channels:
+                self.subscribers.setdefault(channel, set()).add(inbox)
+        try:
+            while True:
+                try:
+                    yield inbox.get(timeout=timeout)
+                except queue.Empty:
+                    yield None
+        finally:
+            with self.lock:
+                for channel in channels:
+                    self.subscribers.get(channel, set()).discard(inbox)
+
+    async def alisten(self, channels, timeout):
+        """listen() for async handlers; publishers on other threads hand messages to the event loop"""
+        inbox = _LoopInbox(asyncio.get_running_loop())
+        with self.lock:
+            for channel in channels:
+                self.subscribers.setdefault(channel, set()).add(inbox)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(inbox.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self.lock:
+                for channel in channels:
+                    self.subscribers.get(channel, set()).discard(inbox)
+
+
+class _LoopInbox:
+    """Queue-like subscriber that delivers into an asyncio queue from any thread"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=1000)
+
+    def _deliver(self, item):
+        if not self.queue.full():
+            self.queue.put_nowait(item)
+
+    def put_nowait(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, item)
+        except RuntimeError:
+            # Event loop already closed; the subscriber is gone
+            pass
+
+
+class RedisBroker:
+    """Pub/sub over Redis so every worker sees every message"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def publish(self, channel, message):
+        self.client.publish(CHANNEL_PREFIX + channel, message)
+
+    def listen(self, channels, timeout):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*[CHANNEL_PREFIX + channel for channel in channels])
+        try:
+            while True:
+                message = pubsub.get_message(timeout=timeout)
+                if message is None:
+                    yield None
+                else:
+                    yield message['channel'][len(CHANNEL_PREFIX):], message['data']
+        finally:
+            pubsub.close()
+
+
+async def _redis_alisten(client, channels, timeout):
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(*[CHANNEL_PREFIX + channel for channel in channels])
+    try:
+        while True:
+            message = await pubsub.get_message(timeout=timeout)
+            if message is None:
+                yield None
+            else:
+                yield message['channel'][len(CHANNEL_PREFIX):], message['data']
+    finally:
+        await pubsub.aclose()
+
+
+_memory_broker = MemoryBroker()
+
+def _broker():
+    client = get_redis()
+    return RedisBroker(client) if client else _memory_broker
+
+def publish(channel, event_type, payload):
+    """Send a small delta to subscribers; never fails the calling request"""
+    try:
+        _broker().publish(channel, json.dumps(dict(payload, type=event_type), default=str))
+    except Exception as e:
+        current_app.logger.warning('Publish to %s failed: %s', channel, e)
+
+async def apublish(channel, event_type, payload):
+    """publish() for async handlers"""
+    message = json.dumps(dict(payload, type=event_type), default=str)
+    try:
+        client = await get_async_redis()
+        if client:
+            await client.publish(CHANNEL_PREFIX + channel, message)
+        else:
+            _memory_broker.publish(channel, message)
+    except Exception as e:
+        current_app.logger.warning('Publish to %s failed: %s', channel, e)
+
+def stream(channels):
+    """Yield Server-Sent Events for the given channels, with heartbeats while idle"""
+    yield 'retry: 3000\n\n'
+    for item in _broker().listen(channels, HEARTBEAT_SECONDS):
+        if item is None:
+            yield ': keep-alive\n\n'
+        else:
+            channel, message = item
+            yield f'event: {channel}\ndata: {message}\n\n'
+
+async def astream(channels):
+    """stream() for async handlers: an idle subscriber holds no thread"""
+    client = await get_async_redis()
+    listener = _redis_alisten(client, channels, HEARTBEAT_SECONDS) if client else \
+        _memory_broker.alisten(channels, HEARTBEAT_SECONDS)
+    try:
+        yield 'retry: 3000\n\n'
+        async for item in listener:
+            if item is None:
+                yield ': keep-alive\n\n'
+            else:
+                channel, message = item
+                yield f'event: {channel}\ndata: {message}\n\n'
+    finally:
+        # Unsubscribe as soon as the client goes away
+        await listener.aclose()
@@ -0,0 +1,160 @@
+from app import db
+from app.models import BagsGame, PlayerRating, RatingSnapshot
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+REPLAY_BATCH_SIZE = 2000
+
+def expected_score(rating, opponent_rating):
+    """Elo win probability of a side rated `rating` against `opponent_rating`"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+def _team_ids(players):
+    # Guests have no stored rating and play at the initial rating
+    return [
+        p['id'].replace('user_', '') if p.get('id') and p['id'].startswith('user_') else None
+        for p in players or []
+    ]
+
+def rate_game(team1, team2, winning_team, ratings):
+    """Rating deltas for one game.
+
+    Teams are rated by their mean, so strong partners lift the expectation
+    and every registered player on a side moves by the same amount.
+    Returns {player_id: delta} for registered players.
+    """
+    def team_rating(team):
+        values = [ratings.get(player_id, INITIAL_RATING) if player_id else INITIAL_RATING for player_id in team]
+        return sum(values) / len(values) if values else INITIAL_RATING
+
+    rating1, rating2 = team_rating(team1), team_rating(team2)
+    change = K_FACTOR * ((1.0 if winning_team == 1 else 0.0) - expected_score(rating1, rating2))
+
+    deltas = {}
+    for player_id in team1:
+        if player_id:
+            deltas[player_id] = change
+    for player_id in team2:
+        if player_id:
+            deltas[player_id] = -change
+    return deltas
+
+def _apply_totals(totals, counts, now):
+    """Add rating deltas per player, creating missing rows at the initial rating.
+
+    One upsert, so two requests rating a player's first games at the same
+    time both count instead of one failing on the primary key.
+    """
+    rows = [{
+        'player_id': player_id, 'rating': INITIAL_RATING + total,
+        'games_rated': counts[player_id], 'updated_at': now
+    } for player_id, total in totals.items()]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialect == 'sqlite' else postgresql).insert(PlayerRating)
+        db.session.execute(insert.on_conflict_do_update(
+            index_elements=['player_id'],
+            set_={
+                # Increment rather than overwrite so concurrent games both count
+                'rating': PlayerRating.rating + (insert.excluded.rating - INITIAL_RATING),
+                'games_rated': PlayerRating.games_rated + insert.excluded.games_rated,
+                'updated_at': insert.excluded.updated_at
+            }
+        ), rows)
+        return
+
+    # Other databases: increment existing rows, then insert the rest
+    for row in rows:
+        updated = db.session.query(PlayerRating).filter_by(player_id=row['player_id']).update({
+            PlayerRating.rating: PlayerRating.rating + totals[row['player_id']],
+            PlayerRating.games_rated: PlayerRating.games_rated + row['games_rated'],
+            PlayerRating.updated_at: now
+        }, synchronize_session=False)
+        if not updated:
+            db.session.execute(db.insert(PlayerRating), [row])
+
+def record_games(games):
+    """Update ratings for newly recorded games inside the caller's transaction.
+
+    Loads the players' current ratings in one IN query, applies the games in
+    start order, then writes snapshots and atomic rating increments.
+    """
+    games = sorted(games, key=lambda game: (game.started_at, game.id))
+    teams = [(_team_ids(game.team1_players), _team_ids(game.team2_players)) for game in games]
+    player_ids = {player_id for team1, team2 in teams for player_id in team1 + team2 if player_id}
+    if not player_ids:
+        return {}
+
+    stored = {
+        row.player_id: row.rating for row in
+        db.session.query(PlayerRating.player_id, PlayerRating.rating).filter(PlayerRating.player_id.in_(player_ids))
+    }
+    ratings = dict(stored)
+    totals = {}
+    counts = {}
+    snapshots = []
+    for game, (team1, team2) in zip(games, teams):
+        for player_id, delta in rate_game(team1, team2, game.winning_team, ratings).items():
+            ratings[player_id] = ratings.get(player_id, INITIAL_RATING) + delta
+            totals[player_id] = totals.get(player_id, 0) + delta
+            counts[player_id] = counts.get(player_id, 0) + 1
+            snapshots.append({
+                'player_id': player_id, 'rated_at': game.started_at, 'game_id': game.id,
+                'rating': ratings[player_id], 'delta': delta
+            })
+
+    _apply_totals(totals, counts, datetime.utcnow())
+    db.session.execute(db.insert(RatingSnapshot), snapshots)
+    return {player_id: ratings[player_id] for player_id in totals}
+
+def replay_all():
+    """Recompute every rating and snapshot from the full game history in one pass.
+
+    Games are streamed in start order in batches; snapshots are bulk
+    inserted per batch and final ratings written once at the end.
+    """
+    db.session.query(RatingSnapshot).delete(synchronize_session=False)
+    db.session.query(PlayerRating).delete(synchronize_session=False)
+
+    columns = (BagsGame.id, BagsGame.team1_players, BagsGame.team2_players, BagsGame.winning_team, BagsGame.started_at)
+    result = db.session.execute(
+        db.select(*columns).order_by(BagsGame.started_at, BagsGame.id)
+        .execution_options(stream_results=True, yield_per=REPLAY_BATCH_SIZE)
+    )
+
+    ratings = {}
+    counts = {}
+    games = 0
+    for batch in result.partitions():
+        snapshots = []
+        for game in batch:
+            team1, team2 = _team_ids(game.team1_players), _team_ids(game.team2_players)
+            for player_id, delta in rate_game(team1, team2, game.winning_team, ratings).items():
+                ratings[player_id] = ratings.get(player_id, INITIAL_RATING) + delta
+                counts[player_id] = counts.get(player_id, 0) + 1
+                snapshots.append({
+                    'player_id': player_id, 'rated_at': game.started_at, 'game_id': game.id,
+                    'rating': ratings[player_id], 'delta': delta
+                })
+        if snapshots:
+            db.session.execute(db.insert(RatingSnapshot), snapshots)
+        games += len(batch)
+
+    now = datetime.utcnow()
+    if ratings:
+        db.session.execute(db.insert(PlayerRating), [{
+            'player_id': player_id, 'rating': rating, 'games_rated': counts[player_id], 'updated_at': now
+        } for player_id, rating in ratings.items()])
+    db.session.commit()
+    return games, len(ratings)
+
+def get_ratings(player_ids):
+    """Stored ratings for players, defaulting to the initial rating"""
+    rows = db.session.query(PlayerRating.player_id, PlayerRating.rating).filter(
+        PlayerRating.player_id.in_(list(player_ids))
+    )
+    ratings = {player_id: INITIAL_RATING for player_id in player_ids}
+    ratings.update({row.player_id: row.rating for row in rows})
+    return ratings
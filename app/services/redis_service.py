@@ -0,0 +1,41 @@
+from flask import current_app
+import threading
+
+_clients = {}
+_lock = threading.Lock()
+
+def get_redis():
+    """Return a shared Redis client for REDIS_URL, or None when Redis is unavailable"""
+    url = current_app.config.get('REDIS_URL')
+    if not url:
+        return None
+    
+    with _lock:
+        if url not in _clients:
+            try:
+                import redis
+                client = redis.Redis.from_url(url, decode_responses=True, socket_connect_timeout=0.5)
+                client.ping()
+            except Exception:
+                # Fall back to in-process structures for this process
+                client = None
+            _clients[url] = client
+        return _clients[url]
+
+_async_clients = {}
+
+async def get_async_redis():
+    """asyncio counterpart of get_redis for the ASGI handlers, or None when Redis is unavailable"""
+    url = current_app.config.get('REDIS_URL')
+    if not url:
+        return None
+    
+    if url not in _async_clients:
+        try:
+            import redis.asyncio
+            client = redis.asyncio.Redis.from_url(url, decode_responses=True, socket_connect_timeout=0.5)
+            await client.ping()
+        except Exception:
+            client = None
+        _async_clients[url] = client
+    return _async_clients[url]
@@ -0,0 +1,158 @@
+from app import db
+from app.models import BagsGame, PlayerPeriodStats, PlayerMatchupStats
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql, sqlite
+
+COUNTERS = ('games', 'wins', 'points_for', 'points_against')
+REBUILD_BATCH_SIZE = 2000
+
+def _period_starts(day):
+    return (('day', day), ('month', day.replace(day=1)), ('year', day.replace(month=1, day=1)))
+
+def _registered(players):
+    return [p['id'].replace('user_', '') for p in players or [] if p.get('id') and p['id'].startswith('user_')]
+
+def _add(totals, key, won, points_for, points_against):
+    counters = totals.get(key)
+    if counters is None:
+        counters = totals[key] = [0, 0, 0, 0]
+    counters[0] += 1
+    counters[1] += won
+    counters[2] += points_for
+    counters[3] += points_against
+
+def _accumulate(game, periods, matchups):
+    """Add one game's contribution for every registered player to the running totals"""
+    day = game.started_at.date()
+    teams = (
+        (_registered(game.team1_players), _registered(game.team2_players), game.team1_score, game.team2_score, 1),
+        (_registered(game.team2_players), _registered(game.team1_players), game.team2_score, game.team1_score, 2)
+    )
+    for team, opponents, points_for, points_against, number in teams:
+        won = int(game.winning_team == number)
+        for player_id in team:
+            for period, start in _period_starts(day):
+                _add(periods, (player_id, period, start), won, points_for, points_against)
+            for partner_id in team:
+                if partner_id != player_id:
+                    _add(matchups, (player_id, partner_id, 'partner', day.year), won, points_for, points_against)
+            for opponent_id in opponents:
+                _add(matchups, (player_id, opponent_id, 'opponent', day.year), won, points_for, points_against)
+
+def _rows(totals, key_columns):
+    return [dict(zip(key_columns + COUNTERS, key + tuple(counters))) for key, counters in totals.items()]
+
+def _upsert(model, rows):
+    """Insert rows, adding their counters to any row that already exists"""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialect == 'sqlite' else postgresql).insert(model)
+        table = model.__table__
+        statement = insert.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={name: table.c[name] + insert.excluded[name] for name in COUNTERS}
+        )
+        db.session.execute(statement, rows)
+        return
+
+    # Other databases: increment existing rows, then insert the rest
+    keys = [column.name for column in model.__table__.primary_key]
+    for row in rows:
+        updated = db.session.query(model).filter_by(**{key: row[key] for key in keys}).update(
+            {getattr(model, name): getattr(model, name) + row[name] for name in COUNTERS},
+            synchronize_session=False
+        )
+        if not updated:
+            db.session.execute(db.insert(model), [row])
+
+def record_games(games):
+    """Fold newly recorded games into the rollups inside the caller's transaction"""
+    periods, matchups = {}, {}
+    for game in games:
+        _accumulate(game, periods, matchups)
+    _upsert(PlayerPeriodStats, _rows(periods, ('player_id', 'period', 'period_start')))
+    _upsert(PlayerMatchupStats, _rows(matchups, ('player_id', 'other_id', 'relation', 'season')))
+
+def rebuild():
+    """Recompute every rollup from the full game history in one streamed pass"""
+    db.session.query(PlayerPeriodStats).delete(synchronize_session=False)
+    db.session.query(PlayerMatchupStats).delete(synchronize_session=False)
+
+    columns = (BagsGame.team1_players, BagsGame.team2_players, BagsGame.team1_score,
+               BagsGame.team2_score, BagsGame.winning_team, BagsGame.started_at)
+    result = db.session.execute(
+        db.select(*columns).execution_options(stream_results=True, yield_per=REBUILD_BATCH_SIZE)
+    )
+
+    periods, matchups = {}, {}
+    games = 0
+    for batch in result.partitions():
+        for game in batch:
+            _accumulate(game, periods, matchups)
+        games += len(batch)
+
+    period_rows = _rows(periods, ('player_id', 'period', 'period_start'))
+    matchup_rows = _rows(matchups, ('player_id', 'other_id', 'relation', 'season'))
+    for start in range(0, len(period_rows), REBUILD_BATCH_SIZE):
+        db.session.execute(db.insert(PlayerPeriodStats), period_rows[start:start + REBUILD_BATCH_SIZE])
+    for start in range(0, len(matchup_rows), REBUILD_BATCH_SIZE):
+        db.session.execute(db.insert(PlayerMatchupStats), matchup_rows[start:start + REBUILD_BATCH_SIZE])
+    db.session.commit()
+    return games, len(period_rows), len(matchup_rows)
+
+def summarize(rows):
+    """Combine counter rows into games, wins, losses, win rate, points and average margin"""
+    games = sum(row.games for row in rows)
+    wins = sum(row.wins for row in rows)
+    points_for = sum(row.points_for for row in rows)
+    points_against = sum(row.points_against for row in rows)
+    return {
+        'games': games,
+        'wins': wins,
+        'losses': games - wins,
+        'win_rate': round(wins / games * 100, 1) if games else 0,
+        'points_for': points_for,
+        'points_against': points_against,
+        'avg_margin': round((points_for - points_against) / games, 1) if games else 0
+    }
+
+def get_period_summary(player_id, today=None):
+    """Last 30 days, this month and this season from one query over at most 32 rows"""
+    today = today or datetime.utcnow().date()
+    window_start = today - timedelta(days=29)
+    month_start = today.replace(day=1)
+    season_start = today.replace(month=1, day=1)
+
+    rows = PlayerPeriodStats.query.filter(
+        PlayerPeriodStats.player_id == player_id,
+        db.or_(
+            db.and_(PlayerPeriodStats.period == 'day', PlayerPeriodStats.period_start >= window_start),
+            db.and_(PlayerPeriodStats.period == 'month', PlayerPeriodStats.period_start == month_start),
+            db.and_(PlayerPeriodStats.period == 'year', PlayerPeriodStats.period_start == season_start)
+        )
+    ).all()
+    return {
+        'last_30_days': summarize([row for row in rows if row.period == 'day']),
+        'this_month': summarize([row for row in rows if row.period == 'month']),
+        'this_season': summarize([row for row in rows if row.period == 'year'])
+    }
+
+def get_matchups(player_id, season=None):
+    """Partner and opponent records, most games first, over one season or all seasons"""
+    query = db.session.query(
+        PlayerMatchupStats.other_id,
+        PlayerMatchupStats.relation,
+        *[db.func.sum(getattr(PlayerMatchupStats, name)).label(name) for name in COUNTERS]
+    ).filter(PlayerMatchupStats.player_id == player_id)
+    if season is not None:
+        query = query.filter(PlayerMatchupStats.season == season)
+    rows = query.group_by(PlayerMatchupStats.other_id, PlayerMatchupStats.relation).all()
+
+    matchups = {'partners': [], 'opponents': []}
+    for row in sorted(rows, key=lambda row: (-row.games, row.other_id)):
+        matchups['partners' if row.relation == 'partner' else 'opponents'].append(
+            dict(summarize([row]), player_id=row.other_id)
+        )
+    return matchups
@@ -0,0 +1,49 @@
+from app import db
+from app.cache import TTLCache
+from app.models import User, Event, BagsGame, BagsTournament
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_cache = TTLCache()
+_STATS_KEY = 'admin_stats'
+_WATCHED = (User, Event, BagsGame, BagsTournament)
+
+def _count(model, *criteria):
+    return db.select(db.func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+def compute_admin_stats():
+    """All dashboard counters in a single statement"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    row = db.session.execute(db.select(
+        _count(User).label('total_users'),
+        _count(User, User.is_active.is_(True)).label('active_users'),
+        _count(Event).label('total_events'),
+        _count(BagsGame).label('total_bags_games'),
+        _count(BagsTournament).label('total_tournaments'),
+        _count(User, User.last_login >= today).label('users_logged_in_today')
+    )).one()
+    
+    stats = dict(row._mapping)
+    stats['total_sightings'] = 0  # Placeholder for future feature
+    return stats
+
+def get_admin_stats():
+    """Dashboard counters, cached for ADMIN_STATS_CACHE_TTL seconds"""
+    stats = _cache.get(_STATS_KEY)
+    if stats is None:
+        stats = compute_admin_stats()
+        _cache.set(_STATS_KEY, stats, ttl=current_app.config.get('ADMIN_STATS_CACHE_TTL', 30))
+    return stats
+
+def invalidate_admin_stats():
+    _cache.delete(_STATS_KEY)
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_on_write(session, flush_context):
+    # Any insert, delete or update of a counted model makes the cached stats stale
+    for obj in (*session.new, *session.deleted, *session.dirty):
+        if isinstance(obj, _WATCHED):
+            invalidate_admin_stats()
+            return
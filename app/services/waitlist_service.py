@@ -0,0 +1,318 @@
+from app.services.redis_service import get_async_redis, get_redis
+from datetime import datetime
+from flask import current_app
+import bisect
+import itertools
+import json
+import threading
+
+QUEUE_KEY = 'waitlist:queue'
+ENTRIES_KEY = 'waitlist:entries'
+SEQ_KEY = 'waitlist:seq'
+
+# Join is one round trip: allocate a ticket and add the player only if absent
+_JOIN_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return {0, redis.call('ZRANK', KEYS[1], ARGV[1])}
+end
+local seq = redis.call('INCR', KEYS[3])
+redis.call('ZADD', KEYS[1], seq, ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+return {1, redis.call('ZRANK', KEYS[1], ARGV[1])}
+"""
+
+# Pop up to N players from the head of the queue with their entries
+_POP_SCRIPT = """
+local popped = redis.call('ZPOPMIN', KEYS[1], ARGV[1])
+local result = {}
+for i = 1, #popped, 2 do
+    local entry = redis.call('HGET', KEYS[2], popped[i])
+    redis.call('HDEL', KEYS[2], popped[i])
+    table.insert(result, entry)
+end
+return result
+"""
+
+# Remove specific players only if all of them are still waiting
+_TAKE_SCRIPT = """
+for i = 1, #ARGV do
+    if not redis.call('ZSCORE', KEYS[1], ARGV[i]) then
+        return {}
+    end
+end
+local result = {}
+for i = 1, #ARGV do
+    redis.call('ZREM', KEYS[1], ARGV[i])
+    table.insert(result, redis.call('HGET', KEYS[2], ARGV[i]))
+    redis.call('HDEL', KEYS[2], ARGV[i])
+end
+return result
+"""
+
+
+class RedisWaitlist:
+    """FIFO waitlist in a Redis sorted set scored by a ticket counter"""
+
+    def __init__(self, client):
+        self.client = client
+        self._join = client.register_script(_JOIN_SCRIPT)
+        self._pop = client.register_script(_POP_SCRIPT)
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    def join(self, entry):
+        added, rank = self._join(keys=[QUEUE_KEY, ENTRIES_KEY, SEQ_KEY], args=[entry['id'], json.dumps(entry)])
+        return bool(added), rank + 1
+
+    def leave(self, player_id):
+        pipe = self.client.pipeline()
+        pipe.zrem(QUEUE_KEY, player_id)
+        pipe.hdel(ENTRIES_KEY, player_id)
+        removed, _ = pipe.execute()
+        return bool(removed)
+
+    def pop(self, count):
+        return [json.loads(raw) for raw in self._pop(keys=[QUEUE_KEY, ENTRIES_KEY], args=[count]) if raw]
+
+    def take(self, player_ids):
+        return [json.loads(raw) for raw in self._take(keys=[QUEUE_KEY, ENTRIES_KEY], args=player_ids) if raw]
+
+    def position(self, player_id):
+        rank = self.client.zrank(QUEUE_KEY, player_id)
+        return None if rank is None else rank + 1
+
+    def list(self, limit):
+        ids = self.client.zrange(QUEUE_KEY, 0, limit - 1)
+        if not ids:
+            return []
+        return [json.loads(raw) for raw in self.client.hmget(ENTRIES_KEY, ids) if raw]
+
+    def size(self):
+        return self.client.zcard(QUEUE_KEY)
+
+
+class MemoryWaitlist:
+    """In-process fallback for single-process deployments and tests"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = itertools.count(1)
+        self.order = []  # (ticket, player_id), ascending
+        self.tickets = {}
+        self.entries = {}
+
+    def join(self, entry):
+        with self.lock:
+            player_id = entry['id']
+            if player_id in self.tickets:
+                return False, bisect.bisect_left(self.order, (self.tickets[player_id], player_id)) + 1
+            ticket = next(self.seq)
+            self.tickets[player_id] = ticket
+            self.entries[player_id] = entry
+            self.order.append((ticket, player_id))  # Tickets only grow, so this stays sorted
+            return True, len(self.order)
+
+    def leave(self, player_id):
+        with self.lock:
+            ticket = self.tickets.pop(player_id, None)
+            if ticket is None:
+                return False
+            del self.order[bisect.bisect_left(self.order, (ticket, player_id))]
+            del self.entries[player_id]
+            return True
+
+    def pop(self, count):
+        with self.lock:
+            head, self.order = self.order[:count], self.order[count:]
+            popped = []
+            for _, player_id in head:
+                del self.tickets[player_id]
+                popped.append(self.entries.pop(player_id))
+            return popped
+
+    def take(self, player_ids):
+        with self.lock:
+            if not all(player_id in self.tickets for player_id in player_ids):
+                return []
+            taken = []
+            for player_id in player_ids:
+                ticket = self.tickets.pop(player_id)
+                del self.order[bisect.bisect_left(self.order, (ticket, player_id))]
+                taken.append(self.entries.pop(player_id))
+            return taken
+
+    def position(self, player_id):
+        with self.lock:
+            ticket = self.tickets.get(player_id)
+            if ticket is None:
+                return None
+            return bisect.bisect_left(self.order, (ticket, player_id)) + 1
+
+    def list(self, limit):
+        with self.lock:
+            return [self.entries[player_id] for _, player_id in self.order[:limit]]
+
+    def size(self):
+        with self.lock:
+            return len(self.order)
+
+
+class AsyncRedisWaitlist:
+    """RedisWaitlist over redis.asyncio for the ASGI handlers; same keys and scripts"""
+
+    def __init__(self, client):
+        self.client = client
+        self._join = client.register_script(_JOIN_SCRIPT)
+        self._pop = client.register_script(_POP_SCRIPT)
+        self._take = client.register_script(_TAKE_SCRIPT)
+
+    async def join(self, entry):
+        added, rank = await self._join(keys=[QUEUE_KEY, ENTRIES_KEY, SEQ_KEY], args=[entry['id'], json.dumps(entry)])
+        return bool(added), rank + 1
+
+    async def leave(self, player_id):
+        async with self.client.pipeline() as pipe:
+            pipe.zrem(QUEUE_KEY, player_id)
+            pipe.hdel(ENTRIES_KEY, player_id)
+            removed, _ = await pipe.execute()
+        return bool(removed)
+
+    async def pop(self, count):
+        return [json.loads(raw) for raw in await self._pop(keys=[QUEUE_KEY, ENTRIES_KEY], args=[count]) if raw]
+
+    async def take(self, player_ids):
+        return [json.loads(raw) for raw in await self._take(keys=[QUEUE_KEY, ENTRIES_KEY], args=player_ids) if raw]
+
+    async def position(self, player_id):
+        rank = await self.client.zrank(QUEUE_KEY, player_id)
+        return None if rank is None else rank + 1
+
+    async def list(self, limit):
+        ids = await self.client.zrange(QUEUE_KEY, 0, limit - 1)
+        if not ids:
+            return []
+        return [json.loads(raw) for raw in await self.client.hmget(ENTRIES_KEY, ids) if raw]
+
+    async def size(self):
+        return await self.client.zcard(QUEUE_KEY)
+
+
+class AsyncMemoryWaitlist:
+    """Awaitable view of the in-process waitlist; its operations never block on I/O"""
+
+    def __init__(self, waitlist):
+        self.waitlist = waitlist
+
+    def __getattr__(self, name):
+        method = getattr(self.waitlist, name)
+
+        async def call(*args):
+            return method(*args)
+        return call
+
+
+_memory_waitlist = MemoryWaitlist()
+
+def _waitlist():
+    client = get_redis()
+    return RedisWaitlist(client) if client else _memory_waitlist
+
+async def async_waitlist():
+    """Waitlist backend for async handlers; shares its state with the sync functions below"""
+    client = await get_async_redis()
+    return AsyncRedisWaitlist(client) if client else AsyncMemoryWaitlist(_memory_waitlist)
+
+def new_entry(player_id, name):
+    return {'id': player_id, 'name': name, 'joined_at': datetime.utcnow().isoformat()}
+
+def _announce(event_type, payload):
+    from app.services import pubsub_service
+    pubsub_service.publish('waitlist', event_type, payload)
+
+async def _aannounce(event_type, payload):
+    from app.services import pubsub_service
+    await pubsub_service.apublish('waitlist', event_type, payload)
+
+def member_name(session, player_id):
+    """Display name for a registered player id (user_<id>), or None for guests and unknown ids"""
+    from app.models import User
+    if not player_id.startswith('user_'):
+        return None
+    user = session.get(User, player_id.replace('user_', ''))
+    return user.get_display_name() if user else None
+
+async def amember_name(player_id):
+    async with current_app.extensions['async_session']() as session:
+        return await session.run_sync(member_name, player_id)
+
+def may_remove(player_id, user_id):
+    """Members may take themselves or guests off the list; other members need an admin"""
+    return not player_id.startswith('user_') or player_id == 'user_' + user_id
+
+def join(player_id, name):
+    """Add a player once and announce it; returns (added, position)"""
+    added, position = _waitlist().join(new_entry(player_id, name))
+    if added:
+        _announce('joined', {'player': {'id': player_id, 'name': name}, 'position': position})
+    return added, position
+
+async def ajoin(player_id, name):
+    added, position = await (await async_waitlist()).join(new_entry(player_id, name))
+    if added:
+        await _aannounce('joined', {'player': {'id': player_id, 'name': name}, 'position': position})
+    return added, position
+
+def leave(player_id):
+    """Remove a player and announce it; returns False if they were not waiting"""
+    removed = _waitlist().leave(player_id)
+    if removed:
+        _announce('left', {'player_id': player_id})
+    return removed
+
+async def aleave(player_id):
+    removed = await (await async_waitlist()).leave(player_id)
+    if removed:
+        await _aannounce('left', {'player_id': player_id})
+    return removed
+
+def pop_next(count=1):
+    """Atomically take the next players off the head of the queue"""
+    players = _waitlist().pop(count)
+    if players:
+        _announce('popped', {'player_ids': [p['id'] for p in players]})
+    return players
+
+async def apop_next(count=1):
+    players = await (await async_waitlist()).pop(count)
+    if players:
+        await _aannounce('popped', {'player_ids': [p['id'] for p in players]})
+    return players
+
+def take(player_ids):
+    """Atomically remove the given players, or nobody if any has already left"""
+    taken = _waitlist().take(list(player_ids))
+    if taken:
+        _announce('matched', {'player_ids': list(player_ids)})
+    return taken
+
+def get_position(player_id):
+    """1-based queue position, or None if not waiting"""
+    return _waitlist().position(player_id)
+
+def get_waitlist(limit=100):
+    """Waiting players in queue order"""
+    return _waitlist().list(limit)
+
+def get_size():
+    return _waitlist().size()
+
+def snapshot(limit, player_id):
+    """The head of the queue, its size and player_id's position"""
+    return {'waitlist': get_waitlist(limit), 'size': get_size(), 'my_position': get_position(player_id)}
+
+async def asnapshot(limit, player_id):
+    waitlist = await async_waitlist()
+    return {
+        'waitlist': await waitlist.list(limit),
+        'size': await waitlist.size(),
+        'my_position': await waitlist.position(player_id)
+    }
@@ -0,0 +1,5 @@
+from app.asgi import create_asgi_app
+from config import get_config
+
+# uvicorn asgi:app
+app = create_asgi_app(get_config())
@@ -0,0 +1,184 @@
+"""Load-test the main API endpoints against a seeded database and report JSON.
+
+Usage: python benchmarks/api_load.py [--users 10000] [--games 500000]
+           [--requests 200] [--concurrency 4] [--db bench.db] [--output results.json]
+
+The database is seeded with benchmarks/synthetic.py (deterministic for a
+given --seed) and kept at --db, so later runs with the same sizes reuse
+it. Each endpoint is driven through the Flask test client with
+instrumentation on. Per endpoint the report gives p50/p95/p99 latency,
+throughput and the SQL statements per request. Compare the JSON from two
+commits to spot regressions.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from config import Config
+from synthetic import BENCH_PASSWORD, seed
+
+
+def scenarios(user_ids):
+    """(name, method, path or path factory, json body factory) per endpoint"""
+    rng = random.Random(99)
+    player = lambda: rng.choice(user_ids)
+    return [
+        ('GET /api/health', 'get', '/api/health', None),
+        ('GET /api/events', 'get', '/api/events?limit=50', None),
+        ('GET /api/bags/games', 'get', '/api/bags/games?limit=50', None),
+        ('GET /api/bags/games?player_id', 'get', lambda: f'/api/bags/games?limit=20&player_id={player()}', None),
+        ('GET /api/bags/stats/leaderboard', 'get', '/api/bags/stats/leaderboard', None),
+        ('GET /api/bags/stats/ratings', 'get', '/api/bags/stats/ratings', None),
+        ('GET /api/bags/stats/player/<id>', 'get', lambda: f'/api/bags/stats/player/{player()}', None),
+        ('GET /api/bags/tournaments', 'get', '/api/bags/tournaments', None),
+        ('GET /api/auth/admin/users', 'get', '/api/auth/admin/users?limit=50', None),
+        ('GET /api/auth/admin/stats', 'get', '/api/auth/admin/stats', None),
+        ('POST /api/auth/login', 'post', '/api/auth/login',
+         lambda: {'email': f'member{rng.randrange(len(user_ids))}@bench.example.com', 'password': BENCH_PASSWORD}),
+        # Writes last so every read runs against the same data
+        ('POST /api/bags/games', 'post', '/api/bags/games', lambda: {
+            'team1_players': [{'id': 'user_' + player(), 'name': 'A'}, {'id': 'guest_a', 'name': 'B'}],
+            'team2_players': [{'id': 'user_' + player(), 'name': 'C'}, {'id': 'guest_b', 'name': 'D'}],
+            'team1_score': 21, 'team2_score': rng.randint(0, 20)
+        }),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(app, headers, method, path, body, requests, concurrency, warmup):
+    local = threading.local()
+    lock = threading.Lock()
+    latencies, queries, errors = [], [], []
+
+    def call(_):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app.test_client()
+        url = path() if callable(path) else path
+        payload = body() if body else None
+        start = time.perf_counter()
+        response = getattr(client, method)(url, json=payload, headers=headers)
+        elapsed = time.perf_counter() - start
+        timing = response.headers.get('Server-Timing', '')
+        count = int(timing.split('desc="')[1].split(' ')[0]) if 'desc="' in timing else None
+        with lock:
+            latencies.append(elapsed * 1000)
+            if count is not None:
+                queries.append(count)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+
+    for index in range(warmup):
+        call(index)
+    latencies.clear(), queries.clear(), errors.clear()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': len(errors),
+        'error_statuses': sorted(set(errors)),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2),
+        'throughput_rps': round(requests / wall, 1),
+        'queries_mean': round(statistics.fmean(queries), 2) if queries else None,
+        'queries_max': max(queries) if queries else None
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--games', type=int, default=500000)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--db', default=None, help='SQLite file to seed and reuse (default: bench-<users>-<games>.db in the temp dir)')
+    parser.add_argument('--only', default=None, help='Comma-separated substrings; run matching endpoints only')
+    parser.add_argument('--output', default=None, help='Write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.gettempdir(), f'edgewater-bench-{args.users}-{args.games}-{args.seed}.db')
+    fresh = not os.path.exists(db_path)
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        REDIS_URL = os.environ.get('BENCH_REDIS_URL')
+        INSTRUMENTATION_ENABLED = True
+        SLOW_REQUEST_MS = 10 ** 6
+        SLOW_QUERY_MS = 10 ** 6
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        if fresh:
+            db.create_all()
+            started = time.perf_counter()
+            seed(users=args.users, games=args.games, seed=args.seed)
+            print(f'Seeded {db_path} in {time.perf_counter() - started:.0f}s', file=sys.stderr)
+        user_ids = [row.id for row in db.session.query(User.id).order_by(User.created_at)]
+        # The first seeded member is an admin, so admin endpoints are included
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=user_ids[0])}
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'database': 'sqlite',
+        'redis': bool(BenchConfig.REDIS_URL),
+        'users': args.users,
+        'games': args.games,
+        'seed': args.seed,
+        'concurrency': args.concurrency,
+        'endpoints': {}
+    }
+    only = args.only.split(',') if args.only else None
+    for name, method, path, body in scenarios(user_ids):
+        if only and not any(part in name for part in only):
+            continue
+        report['endpoints'][name] = run_scenario(
+            app, headers, method, path, body, args.requests, args.concurrency, args.warmup
+        )
+        print(f"{name}: p50 {report['endpoints'][name]['p50_ms']} ms", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""Compare how many concurrent SSE connections the WSGI and ASGI modes can hold.
+
+Usage: python benchmarks/asgi_concurrency.py [--connections 100,500,2000]
+           [--workers 1] [--threads 32] [--output results.json]
+
+Each mode is started as a real server on a fresh SQLite database:
+gunicorn with gthread workers serving run:app, and uvicorn serving
+asgi:app. At every connection level the benchmark opens that many
+/api/bags/stream subscribers at once, then, while they are held, times
+GET /api/health probes and publishes one waitlist join to measure how
+many subscribers receive it and how quickly. Redis is left unreachable
+unless BENCH_REDIS_URL is set, so fan-out uses the in-process broker.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from config import Config
+from api_load import git_commit, percentile
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode, port, args):
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', 'run:app', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(args.workers), '--worker-class', 'gthread', '--threads', str(args.threads),
+                '--timeout', '0', '--log-level', 'warning']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port),
+            '--workers', str(args.workers), '--log-level', 'warning']
+
+
+def prepare_database(env):
+    """Create the schema and one member; returns an access token for them"""
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = env['DATABASE_URL']
+        JWT_SECRET_KEY = env['JWT_SECRET_KEY']
+        REDIS_URL = None
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com', first_name='Bench')
+        db.session.add(user)
+        db.session.commit()
+        return create_access_token(identity=user.id)
+
+
+def wait_ready(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + '/api/health', timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'{base_url} did not come up within {timeout}s')
+
+
+def summarize(values):
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None}
+    values = sorted(v * 1000 for v in values)
+    return {'p50_ms': round(percentile(values, 0.50), 2), 'p95_ms': round(percentile(values, 0.95), 2)}
+
+
+async def run_level(base_url, token, connections, args, level):
+    connect_times, delivery_times, failures = [], [], []
+    published = asyncio.Event()
+    published_at = [0.0]
+    headers = {'Authorization': 'Bearer ' + token}
+
+    stream_client = httpx.AsyncClient(
+        base_url=base_url, timeout=httpx.Timeout(None),
+        limits=httpx.Limits(max_connections=None, max_keepalive_connections=0)
+    )
+
+    async def subscriber():
+        started = time.perf_counter()
+        try:
+            async with stream_client.stream('GET', '/api/bags/stream',
+                                            params={'channels': 'waitlist', 'jwt': token}) as response:
+                if response.status_code != 200:
+                    failures.append(response.status_code)
+                    return
+                lines = response.aiter_lines()
+                await asyncio.wait_for(lines.__anext__(), args.connect_timeout)
+                connect_times.append(time.perf_counter() - started)
+                async for line in lines:
+                    if line.startswith('event: waitlist') and published.is_set():
+                        delivery_times.append(time.perf_counter() - published_at[0])
+                        return
+        except (httpx.HTTPError, asyncio.TimeoutError, StopAsyncIteration) as e:
+            failures.append(type(e).__name__)
+
+    tasks = [asyncio.create_task(subscriber()) for _ in range(connections)]
+    deadline = time.monotonic() + args.connect_timeout
+    while len(connect_times) + len(failures) < connections and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    # Probes while every subscriber is being held open
+    probe_times, probe_timeouts = [], 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.probe_timeout) as client:
+        for _ in range(args.probes):
+            started = time.perf_counter()
+            try:
+                (await client.get('/api/health')).raise_for_status()
+                probe_times.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                probe_timeouts += 1
+
+        published_at[0] = time.perf_counter()
+        published.set()
+        try:
+            await client.post('/api/bags/waitlist', headers=headers,
+                              json={'player_id': f'bench_{level}', 'name': 'Bench'})
+        except httpx.HTTPError:
+            pass
+
+    expected = len(connect_times)
+    deadline = time.monotonic() + args.hold
+    while len(delivery_times) < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await stream_client.aclose()
+
+    return {
+        'connections': connections,
+        'connected': len(connect_times),
+        'failed': len(failures),
+        'connect': summarize(connect_times),
+        'health': dict(summarize(probe_times), timeouts=probe_timeouts),
+        'delivered': len(delivery_times),
+        'delivery': summarize(delivery_times)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', default='100,500,2000', help='Comma-separated concurrent subscriber counts')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=32, help='gthread threads per gunicorn worker')
+    parser.add_argument('--connect-timeout', type=float, default=10, help='Seconds for all subscribers to connect')
+    parser.add_argument('--probe-timeout', type=float, default=5)
+    parser.add_argument('--probes', type=int, default=20, help='Health requests timed while subscribers are held')
+    parser.add_argument('--hold', type=float, default=5, help='Seconds to wait for the published event to fan out')
+    parser.add_argument('--output', default=None, help='Write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    # Every subscriber is a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'edgewater-asgi-bench.db')
+    env = {
+        'DATABASE_URL': 'sqlite:///' + db_path,
+        # An unreachable Redis makes both modes use their in-process fallbacks
+        'REDIS_URL': os.environ.get('BENCH_REDIS_URL') or 'redis://127.0.0.1:1/0',
+        'JWT_SECRET_KEY': os.environ.get('JWT_SECRET_KEY') or 'bench-jwt-secret'
+    }
+    token = prepare_database(env)
+    levels = [int(n) for n in args.connections.split(',')]
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'database': 'sqlite',
+        'redis': bool(os.environ.get('BENCH_REDIS_URL')),
+        'workers': args.workers,
+        'threads': args.threads,
+        'modes': {}
+    }
+    for mode in args.modes.split(','):
+        port = free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        server = subprocess.Popen(server_command(mode, port, args), cwd=ROOT, env=dict(os.environ, **env))
+        try:
+            wait_ready(base_url)
+            results = report['modes'][mode] = []
+            for level in levels:
+                result = asyncio.run(run_level(base_url, token, level, args, f'{mode}_{level}'))
+                results.append(result)
+                print(f"{mode} {level}: {result['connected']} connected, health p95 "
+                      f"{result['health']['p95_ms']} ms, {result['delivered']} delivered", file=sys.stderr)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Compare JSON serialization paths for list endpoints with 10k rows.
+
+Usage: python benchmarks/json_serialization.py [--rows 10000] [--repeat 5]
+
+Reports the median time for GET /api/events with the stdlib provider and
+with FastJSONProvider (orjson when installed), and for encoding 10k games
+and users built by to_dict() versus column-only rows.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider
+from app import create_app, db
+from app.json_provider import FastJSONProvider, orjson
+from app.models import User, Event, BagsGame
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    REDIS_URL = None
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def seed(rows):
+    user = User(email='bench@example.com')
+    db.session.add(user)
+    db.session.flush()
+    start = datetime(2024, 5, 1)
+    db.session.execute(db.insert(Event), [{
+        'id': str(uuid.uuid4()), 'title': f'Event {i}', 'description': 'Sunset bonfire ' * 4,
+        'date': start + timedelta(hours=i), 'location': 'Beach Club',
+        'created_by_id': user.id, 'created_at': start
+    } for i in range(rows)])
+    db.session.execute(db.insert(BagsGame), [{
+        'id': str(uuid.uuid4()),
+        'team1_players': [{'id': 'user_a', 'name': 'A'}, {'id': 'user_b', 'name': 'B'}],
+        'team2_players': [{'id': 'user_c', 'name': 'C'}, {'id': 'user_d', 'name': 'D'}],
+        'team1_score': 21, 'team2_score': i % 21, 'winning_team': 1, 'game_type': 'casual',
+        'started_at': start + timedelta(minutes=i), 'ended_at': start + timedelta(minutes=i + 20),
+        'duration_minutes': 20, 'location': 'Beach Club'
+    } for i in range(rows)])
+    db.session.execute(db.insert(User), [{
+        'id': str(uuid.uuid4()), 'email': f'member{i}@example.com', 'first_name': 'Member',
+        'last_name': str(i), 'bags_wins': i % 40, 'bags_losses': i % 30, 'bags_tournament_wins': 0,
+        'events_created': 0, 'sasquatch_sightings': 0, 'is_admin': False, 'is_active': True,
+        'created_at': start
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    stdlib = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    results = {'rows': args.rows, 'orjson': orjson is not None}
+
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+        client = app.test_client()
+
+        app.json = stdlib
+        results['GET /api/events (stdlib provider)'] = median_ms(lambda: client.get('/api/events'), args.repeat)
+        app.json = fast
+        results['GET /api/events (fast provider)'] = median_ms(lambda: client.get('/api/events'), args.repeat)
+
+        games = BagsGame.query.all()
+        game_rows = BagsGame.json_query().all()
+        users = User.query.all()
+        results['games: to_dict + stdlib'] = median_ms(
+            lambda: stdlib.dumps({'games': [g.to_dict() for g in games]}), args.repeat)
+        results['games: to_dict + fast'] = median_ms(
+            lambda: fast.dumps({'games': [g.to_dict() for g in games]}), args.repeat)
+        results['games: column rows + fast'] = median_ms(
+            lambda: fast.dumps({'games': [BagsGame.row_to_json(r) for r in game_rows]}), args.repeat)
+        results['users: to_dict(include_stats) + stdlib'] = median_ms(
+            lambda: stdlib.dumps({'users': [u.to_dict(include_stats=True) for u in users]}), args.repeat)
+        results['users: to_dict(include_stats) + fast'] = median_ms(
+            lambda: fast.dumps({'users': [u.to_dict(include_stats=True) for u in users]}), args.repeat)
+
+    for name, value in results.items():
+        print(f'{name:45} {value:.1f} ms' if isinstance(value, float) else f'{name:45} {value}')
+
+
+if __name__ == '__main__':
+    main()
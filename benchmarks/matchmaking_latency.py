@@ -0,0 +1,91 @@
+"""Measure matchmaking latency as the waiting pool grows.
+
+Usage: python benchmarks/matchmaking_latency.py [--pools 8,32,128,256,512] [--repeat 50]
+
+For each pool size the waitlist is filled with registered players (half
+rated, half with only a win/loss record) and guests, then reports the
+median and worst per-call time of propose_match with a cold and a warm
+strength cache, and of the pruned search alone at the largest window.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import User, PlayerRating
+from app.services import matchmaking_service, waitlist_service
+from config import Config
+
+
+class BenchConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    REDIS_URL = None
+
+
+def timings_ms(fn, repeat, before=None):
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def fill_waitlist(size):
+    """Replace the waitlist with `size` players; every fifth is a guest"""
+    waitlist_service.pop_next(waitlist_service.get_size())
+    users = []
+    for i in range(size):
+        if i % 5 == 4:
+            waitlist_service.join(f'guest_{uuid.uuid4().hex[:8]}', f'Guest {i}')
+            continue
+        user = User(
+            id=str(uuid.uuid4()), email=f'{uuid.uuid4().hex[:12]}@example.com',
+            bags_wins=random.randint(0, 60), bags_losses=random.randint(0, 60)
+        )
+        users.append(user)
+        waitlist_service.join('user_' + user.id, f'Player {i}')
+    db.session.add_all(users)
+    db.session.add_all(
+        PlayerRating(player_id=user.id, rating=random.gauss(1500, 200), games_rated=10)
+        for user in users[::2]
+    )
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pools', default='8,32,128,256,512')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(7)
+    app = create_app(BenchConfig)
+    window = app.config['MATCHMAKING_WINDOW']
+    print(f'window={window} max_window={matchmaking_service.MAX_WINDOW}')
+    print(f"{'pool':>6} {'cold p50':>10} {'cold max':>10} {'warm p50':>10} {'warm max':>10} {'search@max p50':>15}")
+
+    with app.app_context():
+        db.create_all()
+        for size in [int(value) for value in args.pools.split(',')]:
+            fill_waitlist(size)
+            cold = timings_ms(
+                matchmaking_service.propose_match, args.repeat, before=matchmaking_service._strengths.clear
+            )
+            warm = timings_ms(matchmaking_service.propose_match, args.repeat)
+
+            strengths = [random.gauss(1500, 200) for _ in range(min(size, matchmaking_service.MAX_WINDOW))]
+            search, _ = timings_ms(lambda: matchmaking_service.find_match(strengths), args.repeat)
+            print(f'{size:>6} {cold[0]:>8.2f}ms {cold[1]:>8.2f}ms {warm[0]:>8.2f}ms {warm[1]:>8.2f}ms {search:>13.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
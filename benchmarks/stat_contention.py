@@ -0,0 +1,86 @@
+"""Hammer POST /api/bags/games from many threads and check no stat increment is lost.
+
+Usage: python benchmarks/stat_contention.py [--threads 16] [--games 50]
+
+Exits non-zero if the final bags_wins/bags_losses totals differ from the
+number of games recorded, or from what `flask reconcile-bags-stats` rebuilds.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db
+from app.models import User
+from config import Config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--games', type=int, default=50, help='Games posted per thread')
+    args = parser.parse_args()
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+
+    class ContentionConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_file.name
+        REDIS_URL = None
+
+    app = create_app(ContentionConfig)
+    with app.app_context():
+        db.create_all()
+        players = [User(email=f'player{i}@example.com') for i in range(4)]
+        db.session.add_all(players)
+        db.session.commit()
+        player_ids = [player.id for player in players]
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=player_ids[0])}
+
+    # Every game shares the same four players so every request contends
+    game = {
+        'team1_players': [{'id': 'user_' + player_ids[0]}, {'id': 'user_' + player_ids[1]}],
+        'team2_players': [{'id': 'user_' + player_ids[2]}, {'id': 'user_' + player_ids[3]}],
+        'team1_score': 21,
+        'team2_score': 15
+    }
+    failures = []
+
+    def worker():
+        client = app.test_client()
+        for _ in range(args.games):
+            response = client.post('/api/bags/games', json=game, headers=headers)
+            if response.status_code != 201:
+                failures.append(response.get_json())
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    recorded = args.threads * args.games - len(failures)
+    with app.app_context():
+        winners = User.query.filter(User.id.in_(player_ids[:2])).all()
+        losers = User.query.filter(User.id.in_(player_ids[2:])).all()
+        live = [u.bags_wins for u in winners] + [u.bags_losses for u in losers]
+
+        app.test_cli_runner().invoke(args=['reconcile-bags-stats'])
+        db.session.expire_all()
+        rebuilt = [User.query.get(pid).bags_wins for pid in player_ids[:2]] + \
+            [User.query.get(pid).bags_losses for pid in player_ids[2:]]
+
+    os.unlink(db_file.name)
+    print(f'recorded={recorded} failed={len(failures)} live={live} reconciled={rebuilt}')
+    if failures:
+        print('first failure:', failures[0])
+    ok = all(count == recorded for count in live) and live == rebuilt
+    print('OK' if ok else 'LOST UPDATES')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
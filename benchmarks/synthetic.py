@@ -0,0 +1,151 @@
+"""Deterministic synthetic data for benchmarks, written with bulk inserts on the app's models.
+
+Usage from a benchmark, inside an app context:
+
+    from synthetic import seed
+    summary = seed(users=10000, games=500000)
+
+The same --seed always produces the same rows, so results from different
+commits are measured against identical data. Derived data (win/loss
+counters, ratings, period rollups) is rebuilt with the app's own CLI
+commands, the same way an operator would after a bulk import.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import User, BagsGame, BagsGameParticipant, BagsTournament, Event
+from app.services.password_service import hash_password
+
+BENCH_PASSWORD = 'bench-password'
+START = datetime(2023, 5, 1, 9, 0)
+BATCH_SIZE = 5000
+
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Casey', 'Riley', 'Morgan', 'Jamie', 'Drew', 'Quinn']
+LAST_NAMES = ['Shore', 'Dune', 'Marsh', 'Reed', 'Pike', 'Bay', 'Cove', 'Hart', 'Lake', 'Stone']
+LOCATIONS = ['Beach Club', 'North Pit', 'Boardwalk', 'Dock 3']
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+
+
+def user_rows(rng, count, password_hash):
+    """Members with names, one shared password hash (hashing 10k passwords would dominate seeding)"""
+    rows = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows.append({
+            'id': _uuid(rng), 'email': f'member{i}@bench.example.com', 'password_hash': password_hash,
+            'first_name': first, 'last_name': last, 'display_name': f'{first} {last[0]}.',
+            'is_admin': i == 0, 'is_active': True,
+            'bags_wins': 0, 'bags_losses': 0, 'bags_tournament_wins': 0,
+            'events_created': 0, 'sasquatch_sightings': 0,
+            'notify_events': True, 'notify_bags_games': True, 'notify_messages': True,
+            'created_at': START + timedelta(minutes=i), 'updated_at': START + timedelta(minutes=i)
+        })
+    return rows
+
+
+def game_rows(rng, count, user_ids, guest_rate=0.1):
+    """Yield 2v2 games in time order; a heavy-tailed player pick makes some members regulars"""
+    started = START
+    for _ in range(count):
+        started += timedelta(seconds=rng.randint(30, 900))
+        players = []
+        while len(players) < 4:
+            if rng.random() < guest_rate:
+                players.append({'id': f'guest_{rng.getrandbits(32):08x}', 'name': 'Guest'})
+                continue
+            index = min(int(rng.paretovariate(1.2)) - 1, len(user_ids) - 1)
+            player_id = 'user_' + user_ids[(index * 7919) % len(user_ids)]
+            if all(p['id'] != player_id for p in players):
+                players.append({'id': player_id, 'name': 'Member'})
+        team1_score, team2_score = 21, rng.randint(0, 20)
+        if rng.random() < 0.5:
+            team1_score, team2_score = team2_score, team1_score
+        duration = rng.randint(10, 40)
+        yield {
+            'id': _uuid(rng),
+            'team1_players': players[:2], 'team2_players': players[2:],
+            'team1_score': team1_score, 'team2_score': team2_score,
+            'winning_team': 1 if team1_score > team2_score else 2,
+            'game_type': 'casual', 'tournament_id': None, 'tournament_round': None,
+            'started_at': started, 'ended_at': started + timedelta(minutes=duration),
+            'duration_minutes': duration, 'location': rng.choice(LOCATIONS)
+        }
+
+
+def participant_rows(game):
+    """Index rows for a game row, mirroring BagsGame.build_participants"""
+    rows = []
+    for team, players in ((1, game['team1_players']), (2, game['team2_players'])):
+        for player in players:
+            if player['id'].startswith('user_'):
+                rows.append({
+                    'player_id': player['id'].replace('user_', ''), 'started_at': game['started_at'],
+                    'game_id': game['id'], 'team': team, 'won': team == game['winning_team']
+                })
+    return rows
+
+
+def event_rows(rng, count, creator_ids):
+    return [{
+        'id': _uuid(rng), 'title': f'Beach event {i}', 'description': 'Bonfire and bags on the sand',
+        'date': START + timedelta(hours=6 * i), 'location': rng.choice(LOCATIONS),
+        'created_by_id': rng.choice(creator_ids), 'created_at': START
+    } for i in range(count)]
+
+
+def tournament_rows(rng, count, user_ids):
+    rows = []
+    for i in range(count):
+        players = [{'id': 'user_' + user_id, 'name': 'Member'} for user_id in rng.sample(user_ids, 4)]
+        champion = rng.choice(players)
+        rows.append({
+            'id': _uuid(rng), 'name': f'Weekend Cup {i}', 'tournament_type': 4, 'players': players,
+            'bracket': [], 'champion_id': champion['id'], 'champion_name': champion['name'],
+            'status': 'completed', 'current_round': 2, 'created_at': START + timedelta(days=i),
+            'started_at': START + timedelta(days=i), 'completed_at': START + timedelta(days=i, hours=3),
+            'creator_id': user_ids[0], 'version': 1
+        })
+    return rows
+
+
+def seed(users=10000, games=500000, events=2000, tournaments=200, seed=1234):
+    """Fill an empty database and rebuild derived tables; returns row counts"""
+    from flask import current_app
+
+    rng = random.Random(seed)
+    users_data = user_rows(rng, users, hash_password(BENCH_PASSWORD))
+    _insert(User, users_data)
+    user_ids = [row['id'] for row in users_data]
+    _insert(Event, event_rows(rng, events, user_ids[:50]))
+    _insert(BagsTournament, tournament_rows(rng, tournaments, user_ids))
+
+    batch, participants = [], []
+    for game in game_rows(rng, games, user_ids):
+        batch.append(game)
+        participants.extend(participant_rows(game))
+        if len(batch) >= BATCH_SIZE:
+            _insert(BagsGame, batch)
+            _insert(BagsGameParticipant, participants)
+            batch, participants = [], []
+    if batch:
+        _insert(BagsGame, batch)
+        _insert(BagsGameParticipant, participants)
+    db.session.commit()
+
+    runner = current_app.test_cli_runner()
+    for command in ('reconcile-bags-stats', 'recalculate-ratings', 'rebuild-rollups'):
+        result = runner.invoke(args=[command])
+        if result.exit_code != 0:
+            raise RuntimeError(f'{command} failed: {result.output}')
+
+    return {'users': users, 'games': games, 'events': events, 'tournaments': tournaments, 'seed': seed}
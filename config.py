@@ -4,14 +4,79 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+def _database_url():
+    url = os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(basedir, 'instance', 'edgewater.db')
+    # Hosted Postgres providers hand out postgres://, which SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    """Engine options for the database behind url, tuned from the environment.
+
+    create_app uses these unless the config sets SQLALCHEMY_ENGINE_OPTIONS,
+    so switching DATABASE_URL from SQLite to Postgres needs no code change.
+    """
+    if url.startswith('sqlite'):
+        # Connection-level pragmas (WAL etc.) are applied in app.database
+        return {
+            'connect_args': {
+                'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)) / 1000,
+                'check_same_thread': False
+            }
+        }
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # seconds
+        'pool_pre_ping': True
+    }
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'hard-to-guess-string'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-        'sqlite:///' + os.path.join(basedir, 'instance', 'edgewater.db')
+    SQLALCHEMY_DATABASE_URI = _database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite only: applied as pragmas on every new connection
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
     JWT_ACCESS_TOKEN_EXPIRES = 86400  # 24 hours
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
+    # Werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_EXECUTOR = os.environ.get('PASSWORD_HASH_EXECUTOR', 'thread')  # 'thread' or 'process'
+    # Most hashes running at once; requests beyond that wait their turn
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 4))
     REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
-    ADMIN_EMAILS = os.environ.get('ADMIN_EMAILS', '').split(',')
\ No newline at end of file
+    ADMIN_EMAILS = os.environ.get('ADMIN_EMAILS', '').split(',')
+    AUTH_IDENTITY_CACHE_TTL = int(os.environ.get('AUTH_IDENTITY_CACHE_TTL', 60))  # seconds
+    ADMIN_STATS_CACHE_TTL = int(os.environ.get('ADMIN_STATS_CACHE_TTL', 30))  # seconds
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # bytes
+    # Request/SQL timing, slow logs and /metrics; off unless asked for
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '').lower() in ('1', 'true', 'yes')
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '').lower() in ('1', 'true', 'yes')  # raise instead of log
+    MATCHMAKING_WINDOW = int(os.environ.get('MATCHMAKING_WINDOW', 12))  # waiting players considered per match
+    MATCHMAKING_STRENGTH_CACHE_TTL = int(os.environ.get('MATCHMAKING_STRENGTH_CACHE_TTL', 30))  # seconds
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+class ProductionConfig(Config):
+    DEBUG = False
+    TESTING = False
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig
+}
+
+def get_config():
+    """Config class selected by APP_ENV (development or production)"""
+    return config_by_name.get(os.environ.get('APP_ENV', 'development'), Config)
@@ -1,11 +1,13 @@
 from app import create_app, db
+from config import get_config
 from app.models import User, Event
 
-app = create_app()
+app = create_app(get_config())
 
 @app.shell_context_processor
 def make_shell_context():
     return {'db': db, 'User': User, 'Event': Event}
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    # Debug mode comes from the selected config, so production never runs it
+    app.run(debug=app.config['DEBUG'])
\ No newline at end of file